@@ -1,124 +1,162 @@
+import asyncio
 import os
 import traceback
-from typing import TypedDict, Optional, List, Any
+from typing import TypedDict, Optional, List, Any, Dict, Tuple
+import httpx
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import SystemMessage, HumanMessage, BaseMessage
 from langchain_ollama import ChatOllama
 from langgraph.prebuilt import create_react_agent
 
-from services.transcription import TranscriptionService
+from services.transcription import get_transcription_service
+from services.transcript_format import to_columnar, is_confident
+from services.audio import to_pcm
+from services.diarization import diarize, CLINICIAN
+from core.config import settings
 from agent.tools import save_atendimento
+from agent.prompts import CLINICAL_AGENT_PROMPTS
 from core.audit import AgentAuditLogger
-from core.context import transcription_context
+from core.context import transcription_context, transcript_segments_context, saved_records_context
 
 # --- Configuration ---
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
 MODEL_NAME = os.getenv("OLLAMA_MODEL", "llama3.2")
 
-# --- Services ---
-transcription_service = TranscriptionService(model_size="medium")
-
 # --- State ---
 class AgentState(TypedDict):
-    audio_path: str
+    audio_path: Optional[str]
+    audio_bytes: Optional[bytes]  # Encoded audio kept in memory (preferred over audio_path)
+    audio_parts: Optional[List[Any]]  # Consecutive voice notes (bytes or paths) forming one consultation
     chat_id: Optional[str]
+    transcription_profile: Optional[str]
     transcribed_text: Optional[str]
+    transcript_segments: Optional[dict]  # Columnar segments/words, see services/transcript_format.py
     messages: List[BaseMessage]
     final_output: Optional[Any]
+    record_ids: Optional[List[int]]  # Medical records saved by the agent's tool calls
     error: Optional[str]
 
+# --- Agent ---
+
+_agents: Dict[Tuple[str, str], Any] = {}
+_agents_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_agent_runnable(model: str = MODEL_NAME, prompt_version: str = settings.AGENT_PROMPT_VERSION):
+    """
+    The compiled ReAct agent for (model, prompt version), built on first use and reused.
+    Its ChatOllama keeps one pooled async HTTP client to Ollama; that pool is bound to
+    the event loop, so agents are rebuilt if they are requested from a different loop.
+    """
+    global _agents_loop
+    loop = asyncio.get_running_loop()
+    if _agents_loop is not loop:
+        _agents.clear()
+        _agents_loop = loop
+
+    key = (model, prompt_version)
+    agent = _agents.get(key)
+    if agent is None:
+        if prompt_version not in CLINICAL_AGENT_PROMPTS:
+            raise ValueError(f"Unknown agent prompt version: {prompt_version}")
+        print(f"--- Building agent: {model} (prompt v{prompt_version}) ---")
+        llm = ChatOllama(
+            base_url=OLLAMA_HOST,
+            model=model,
+            async_client_kwargs={
+                "timeout": settings.OLLAMA_TIMEOUT_SECONDS,
+                "limits": httpx.Limits(max_connections=settings.OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=settings.OLLAMA_MAX_CONNECTIONS),
+            },
+        )
+        # Define Tools - ONLY ONE NOW
+        tools = [save_atendimento]
+        agent = create_react_agent(llm, tools, prompt=CLINICAL_AGENT_PROMPTS[prompt_version])
+        _agents[key] = agent
+    return agent
+
 # --- Nodes ---
 
-def transcriber_node(state: AgentState) -> AgentState:
+async def transcriber_node(state: AgentState) -> AgentState:
     print("--- Node: Transcriber ---")
+    # Whisper, decoding and diarization are CPU-bound: run them off the event loop
+    return await asyncio.to_thread(_transcribe, state)
+
+def _transcribe(state: AgentState) -> AgentState:
+    audio = state.get("audio_bytes")
     audio_path = state.get("audio_path")
-    if not audio_path or not os.path.exists(audio_path):
-        return {**state, "error": "Audio file not found"}
+    audio_parts = state.get("audio_parts")
+    if not audio and not audio_parts:
+        if not audio_path or not os.path.exists(audio_path):
+            return {**state, "error": "Audio file not found"}
+        audio = audio_path
     
     try:
-        # Transcribe
-        print(f"--- Transcribing audio: {audio_path} ---")
-        text = transcription_service.transcribe(audio_path)
+        service = get_transcription_service(state.get("transcription_profile"))
+        if audio_parts:
+            # Several notes of one consultation: transcribed concurrently, joined in order
+            print(f"--- Transcribing {len(audio_parts)} voice notes as one consultation ---")
+            segments, audio = service.transcribe_parts(audio_parts, word_timestamps=settings.WHISPER_WORD_TIMESTAMPS)
+        else:
+            # Transcribe
+            print(f"--- Transcribing audio: {audio_path or f'{len(audio)} bytes in memory'} ---")
+            if settings.DIARIZATION_ENABLED:
+                # Decode once up front: diarization and Whisper share the same PCM buffer
+                audio = to_pcm(audio)
+            # Long consultations are split at silences and transcribed in parallel
+            segments = service.transcribe_segments(audio, parallel=True, word_timestamps=settings.WHISPER_WORD_TIMESTAMPS)
+        text = " ".join(segment["text"] for segment in segments)
         print(f"--- Transcription complete. First 50 chars: {text[:50]}... ---")
         
-        # Set context for tools to access
-        transcription_context.set(text)
+        prompt_segments = segments
+        if settings.DIARIZATION_ENABLED:
+            segments = diarize(audio, segments)
+            prompt_segments = [segment for segment in segments if segment["speaker"] == CLINICIAN]
+            print(f"--- Diarization: {len(prompt_segments)}/{len(segments)} segments from the clinician ---")
         
-        # Convert to message for the agent
-        messages = [HumanMessage(content=text)]
-        return {**state, "transcribed_text": text, "messages": messages}
+        # Convert to message for the agent, leaving out low-confidence (silence/hallucination) regions
+        prompt_text = " ".join(segment["text"] for segment in prompt_segments if is_confident(segment)) or text
+        if len(prompt_text) < len(text):
+            print(f"--- Prompt reduced to {len(prompt_text)}/{len(text)} chars (low-confidence or non-clinician speech skipped) ---")
+        messages = [HumanMessage(content=prompt_text)]
+        return {
+            **state,
+            "transcribed_text": text,
+            "transcript_segments": to_columnar(segments),
+            "messages": messages,
+        }
     except Exception as e:
         print(f"!!! Transcription Error: {e}")
         traceback.print_exc()
         return {**state, "error": f"Transcription failed: {str(e)}"}
 
-def agent_node(state: AgentState) -> AgentState:
+async def agent_node(state: AgentState) -> AgentState:
     print("--- Node: Agent ---")
     messages = state.get("messages")
     if not messages:
         return {**state, "error": "No messages to process"}
 
-    # Initialize Model
-    llm = ChatOllama(base_url=OLLAMA_HOST, model=MODEL_NAME)
-
-    # Define Tools - ONLY ONE NOW
-    tools = [save_atendimento]
-
-    # System Prompt
-    # System Prompt
-    system_prompt = """You are an expert AI medical assistant specializing in clinical data structuring.
-
-    YOUR MISSION:
-    1. Analyze the audio transcription.
-    2. Classify the attendance type (`anamnese`, `evolucao`, or `completo`).
-    3. Extract ALL clinical data, strictly separating pre-existing history from current actions.
-    4. Call the tool `save_atendimento` EXACTLY ONCE.
-
-    ⚠️ CRITICAL RULES (DO NOT IGNORE):
-    1. **OUTPUT LANGUAGE:** All extracted content values (names, observations, procedures, complaints) MUST remain in **Brazilian Portuguese**.
-    2. **SINGLE EXECUTION:** After calling `save_atendimento` successfully, your task is COMPLETE. Reply with a short confirmation to the user and STOP. DO NOT call the tool again.
-    3. **CPF EXTRACTION:** Look obsessively for 11 digits or the pattern XXX.XXX.XXX-XX. This is vital for patient identification. Extract it to `paciente.cpf`.
-
-    CLINICAL DEFINITIONS:
-    - **MEDICAL HISTORY (`anamnese.historico_medico`):** Refers to PRE-EXISTING conditions (Diabetes, Asthma, Hypertension), allergies, past surgeries, or continuous medication. Do NOT include what was done today.
-    - **CHIEF COMPLAINT (`anamnese.queixa_principal`):** The reason for the CURRENT visit (e.g., "Pain in tooth 36", "Broken filling").
-    - **EVOLUTION (`evolucao`):** Everything performed or observed TODAY.
-        - **`procedimentos` (List):** Extract distinct technical actions here (e.g., "Anestesia", "Restauração", "Sutura"). Do NOT leave them buried in the text.
-        - **`observacoes`:** Clinical findings and narrative of the visit.
-
-    EXAMPLE OF EXPECTED JSON STRUCTURE (Tool Input):
-    {
-    "data": {
-        "paciente": { "nome": "João Silva", "cpf": "123.456.789-00" },
-        "categoria": "completo",
-        "anamnese": {
-        "queixa_principal": "Dor no dente 36",
-        "historico_medico": "Diabético, Alérgico a Penicilina"
-        },
-        "evolucao": {
-        "observacoes": "Paciente com dor aguda. Realizado teste de vitalidade positivo.",
-        "procedimentos": ["Teste de Vitalidade", "Abertura Coronária", "Curativo de Demora"]
-        }
-    }
-    }
-    """
-
-    # Create React Agent
-    agent_runnable = create_react_agent(llm, tools, state_modifier=system_prompt)
-
     try:
+        agent_runnable = get_agent_runnable()
         print("--- Invoking Agent Runnable ---")
         
         # Inject Audit Logger
         audit_logger = AgentAuditLogger()
         
-        result = agent_runnable.invoke(
+        # Context for the tools: the transcript is saved with the record, and saved record
+        # ids come back through the shared list (the ToolNode runs tools in a copied context)
+        record_ids: List[int] = []
+        transcription_context.set(state.get("transcribed_text") or "")
+        transcript_segments_context.set(state.get("transcript_segments"))
+        saved_records_context.set(record_ids)
+        
+        # Async Ollama client; the sync save_atendimento tool is run in an executor by the ToolNode
+        result = await agent_runnable.ainvoke(
             {"messages": messages},
             config={"callbacks": [audit_logger]}
         )
         print("--- Agent Runnable Finished ---")
         
-        return {**state, "messages": result["messages"], "final_output": result}
+        return {**state, "messages": result["messages"], "final_output": result, "record_ids": record_ids}
     except Exception as e:
         print(f"!!! Agent execution failed: {e}")
         traceback.print_exc()
@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import os
 
@@ -6,7 +7,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from agent.graph import app
 
-def run_test():
+async def run_test():
     # Path to a test audio file
     # Inside container, backend is mapped to /app. 
     # Script is in /app/agent/test_graph.py
@@ -21,7 +22,7 @@ def run_test():
     
     inputs = {"audio_path": audio_file}
     
-    for output in app.stream(inputs):
+    async for output in app.astream(inputs):
         for key, value in output.items():
             print(f"Finished Node: {key}")
             if key == "transcriber":
@@ -39,4 +40,4 @@ def run_test():
                 print(f"  Error: {value['error']}")
 
 if __name__ == "__main__":
-    run_test()
+    asyncio.run(run_test())
@@ -3,23 +3,22 @@ from agent.schemas import AtendimentoSchema
 from database import SessionLocal
 from models import MedicalRecord, Appointment, Patient
 import datetime
-from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from core.context import transcription_context
-import unicodedata
-
-def normalize_text(text: str) -> str:
-    """Remove accents, strip and lowercase text."""
-    if not text:
-        return ""
-    return ''.join(c for c in unicodedata.normalize('NFD', text)
-                  if unicodedata.category(c) != 'Mn').lower().strip()
+from core.context import transcription_context, transcript_segments_context, saved_records_context, tenant_context, chat_context
+from core.text import normalize_text
+from services.patient_cache import patient_cache, put_after_commit
+from services.patient_matching import best_match, tenant_filter
 
 def _get_or_create_patient(db: Session, patient_name_raw: str | None, cpf_raw: str | None = None) -> int:
     """
     Busca paciente pelo CPF (prioridade) ou nome, ou cria novo.
+    Não faz commit: alterações são só enviadas (flush) na transação do chamador.
+    A busca usa o motor de matching (services/patient_matching.py): CPF, telefone do
+    chat e similaridade de nome (trigramas + chave fonética), tudo via índices.
     """
     print(f"🔍 DEBUG: Resolving Patient. Name='{patient_name_raw}', CPF='{cpf_raw}'")
+    tenant_id = tenant_context.get()
+    phone = chat_context.get()
 
     # Clean CPF: Extract digits only
     clean_cpf = None
@@ -29,90 +28,73 @@ def _get_or_create_patient(db: Session, patient_name_raw: str | None, cpf_raw: s
             clean_cpf = digits
             print(f"   -> Cleaned CPF: {clean_cpf}")
 
-    # 1. Busca por CPF se existir
-    if clean_cpf:
-        # Check specifically for CPF collision
-        patient = db.query(Patient).filter(Patient.cpf == clean_cpf).first()
-        if patient:
-            print(f"✅ Found patient by CPF: {patient.name} (ID: {patient.id})")
-            return patient.id
+    # 0. Cache em memória (por tenant): CPF, ou nome normalizado quando não há CPF
+    clean_name = patient_name_raw.strip().replace(",", "").split(" (")[0] if patient_name_raw else None
+    cached_id = patient_cache.get(tenant_id, "cpf", clean_cpf) if clean_cpf else patient_cache.get(tenant_id, "name", normalize_text(clean_name))
+    if cached_id:
+        print(f"✅ Found patient in cache (ID: {cached_id})")
+        return cached_id
 
-    # 2. Se não achou por CPF, trata nome
+    # 1. Sem nome: só o CPF pode identificar o paciente
     if not patient_name_raw:
+        if clean_cpf:
+            match = best_match(db, None, clean_cpf, None, tenant_id)
+            if match:
+                print(f"✅ Found patient by CPF: {match.name} (ID: {match.patient_id})")
+                put_after_commit(db, tenant_id, match.patient_id, cpf=clean_cpf)
+                return match.patient_id
+
         unknown_name = "Paciente Não Identificado"
         # Try to find 'unknown' patient to reuse? Or create new? Usually reuse.
         # But if we have a CPF but no name? (Rare edge case)
-        patient = db.query(Patient).filter(Patient.name == unknown_name).first()
+        patient = db.query(Patient).filter(
+            tenant_filter(tenant_id),
+            Patient.name == unknown_name
+        ).first()
         if not patient:
-            patient = Patient(name=unknown_name, cpf=clean_cpf) # Use CPF if available even if name unknown
+            patient = Patient(tenant_id=tenant_id, name=unknown_name, cpf=clean_cpf) # Use CPF if available even if name unknown
             db.add(patient)
-            db.commit()
-            db.refresh(patient)
+            db.flush()
         return patient.id
 
-    clean_name = patient_name_raw.strip().replace(",", "").split(" (")[0]
-    
-    # 3. Busca por Nome (Potencial Homônimo) ou Alias
-    # Searches matches in 'name' OR if the checked name is contained in the 'aliases' array
-    # Note: JSONB contains needs exact match for elements inside the array usually, 
-    # but let's assume aliases are stored as simple strings.
-    # We want to check if 'clean_name' is IN aliases.
-    patient = db.query(Patient).filter(
-        or_(
-            Patient.name.ilike(clean_name),
-            Patient.aliases.contains([clean_name]) 
-        )
-    ).first()
+    # 2. Matching: CPF, telefone e nome/aliases (exato, fonético ou por trigramas)
+    match = best_match(db, clean_name, clean_cpf, phone, tenant_id)
     
-    # 4. Fallback: Busca Normalizada (Python-side)
-    # Se a busca estrita falhou (ex: Banco="Antonio", Input="Antônio"), tentamos normalizar.
-    if not patient:
-        print(f"⚠️ Strict match failed for '{clean_name}'. Attempting normalized scan...")
-        normalized_target = normalize_text(clean_name)
-        
-        # Fetch all patients (MVP approach - OK for small clinic)
-        # Em produção real, usaríamos extensão 'unaccent' ou Full Text Search no Postgres
-        all_patients = db.query(Patient).all()
-        
-        for p in all_patients:
-            # Check Name
-            if normalize_text(p.name) == normalized_target:
-                patient = p
-                print(f"✅ Found patient by Normalized Name: {p.name} (Input: {clean_name})")
-                break
-            
-            # Check Aliases
-            if p.aliases:
-                if any(normalize_text(a) == normalized_target for a in p.aliases):
-                    patient = p
-                    print(f"✅ Found patient by Normalized Alias: {p.name} (Matched: {clean_name})")
-                    break
-    
-    if not patient:
+    if not match:
         # CRIAR NOVO PACIENTE
         print(f"🆕 Creating new patient: {clean_name} | CPF: {clean_cpf}")
-        patient = Patient(name=clean_name, cpf=clean_cpf) # Explicit CPF assignment
+        patient = Patient(tenant_id=tenant_id, name=clean_name, cpf=clean_cpf) # Explicit CPF assignment
         db.add(patient)
-        db.commit()
-        db.refresh(patient)
+        db.flush()
     else:
-        # PACIENTE EXISTENTE (por nome), mas verificar se precisamos atualizar CPF
+        patient = db.get(Patient, match.patient_id)
+        print(f"✅ Found existing patient: {patient.name} (ID: {patient.id}) | {match}")
+        changed = False
+
+        # PACIENTE EXISTENTE, mas verificar se precisamos atualizar CPF
         # Se o paciente encontrado NÃO tem CPF, mas recebemos um CPF agora -> Atualiza.
         if clean_cpf and not patient.cpf:
              print(f"🔄 Enhancing existing patient {patient.name} with CPF {clean_cpf}")
              patient.cpf = clean_cpf
+             changed = True
+
+        # Grafia diferente (ex: "Antonho") confirmada por CPF ou telefone: guarda como alias
+        # para a próxima busca ser exata. Só o nome parecido não basta (poderia ser outra pessoa).
+        spelling = normalize_text(clean_name)
+        if match.corroborated and spelling != patient.name_normalized and spelling not in (patient.aliases_normalized or []):
+             print(f"🔄 Adding alias '{clean_name}' to patient {patient.name}")
+             patient.aliases = [*(patient.aliases or []), clean_name]
+             changed = True
+
+        if changed:
              db.add(patient)
-             db.commit()
-             db.refresh(patient)
-        
-        # Conflict Warning: Found by name, but CPF might differ? 
-        # Logic above handles 'not found by CPF'. So if we are here, 
-        # either clean_cpf is None OR clean_cpf is distinct from patient.cpf (if patient.cpf exists).
-        # For simplicity, we assume if names match, it's the same person, unless we want strict checking.
-        # We only update if missing.
-             
-        print(f"✅ Found existing patient by Name: {patient.name} (ID: {patient.id})")
-        
+             db.flush()
+    
+    # A grafia recebida só vira chave de cache se identificou o paciente com segurança
+    names = [patient.name_normalized]
+    if not match or match.exact or match.corroborated:
+        names.append(normalize_text(clean_name))
+    put_after_commit(db, tenant_id, patient.id, cpf=patient.cpf, names=names)
     return patient.id
 
 @tool
@@ -123,40 +105,39 @@ def save_atendimento(data: AtendimentoSchema, transcription: str = None) -> str:
     """
     print(f"--- TOOL: Saving Atendimento (Unified) ---")
     
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        
-        # 1. Resolve Patient
+        tenant_id = tenant_context.get()
+
+        # 1. Resolve Patient (sem commit: paciente, atendimento e registro entram na mesma transação)
         patient_id = _get_or_create_patient(db, data.paciente.nome, data.paciente.cpf)
             
-        # 2. Cria Appointment
-        appointment = Appointment(patient_id=patient_id, date_time=datetime.datetime.now(), status="completed")
-        db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
-
-        # 3. Salva Registro Único (Atendimento)
-        # Dump completo do schema para JSON
-        full_payload = data.model_dump()
-        
+        # 2. Cria Appointment + Registro Único (Atendimento), com a transcrição do contexto
+        appointment = Appointment(tenant_id=tenant_id, patient_id=patient_id, date_time=datetime.datetime.now(), status="completed")
         rec = MedicalRecord(
-            appointment_id=appointment.id,
+            tenant_id=tenant_id,
+            appointment=appointment,
             record_type="atendimento", # Tipo Unificado
-            structured_content=full_payload,
-            # transcription will be updated via webhook logic or if passed explicitly
-            # The user logic relies on updating it later, so we can leave None or try context if needed
-            full_transcription=None 
+            structured_content=data.model_dump(), # Dump completo do schema para JSON
+            full_transcription=transcription_context.get() or transcription,
+            transcript_segments=transcript_segments_context.get(),
         )
-        
         db.add(rec)
+
+        # One flush (INSERT ... RETURNING id for each row) and one commit
+        db.flush()
+        record_id = rec.id
         db.commit()
-        db.refresh(rec)
         
-        print(f"✅ Saved Unified Record ID {rec.id}")
+        print(f"✅ Saved Unified Record ID {record_id}")
+        saved = saved_records_context.get()
+        if saved is not None:
+            saved.append(record_id)
 
-        return f"Atendimento salvo com sucesso. ID do Registro: {rec.id}"
+        return f"Atendimento salvo com sucesso. ID do Registro: {record_id}"
 
     except Exception as e:
+        db.rollback()
         print(f"Error saving atendimento: {e}")
         return f"Erro ao salvar atendimento: {str(e)}"
     finally:
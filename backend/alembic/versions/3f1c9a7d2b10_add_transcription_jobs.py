@@ -0,0 +1,54 @@
+"""Add transcription_jobs queue table
+
+Revision ID: 3f1c9a7d2b10
+Revises: 7b0dac60f19a
+Create Date: 2026-10-17 09:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b10'
+down_revision: Union[str, Sequence[str], None] = '7b0dac60f19a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('transcription_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.UUID(), nullable=True),
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('chat_id', sa.String(), nullable=True),
+    sa.Column('media_url', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_transcription_jobs_id'), 'transcription_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_transcription_jobs_tenant_id'), 'transcription_jobs', ['tenant_id'], unique=False)
+    op.create_index(op.f('ix_transcription_jobs_message_id'), 'transcription_jobs', ['message_id'], unique=False)
+    op.create_index('ix_transcription_jobs_claim', 'transcription_jobs', ['status', 'priority', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transcription_jobs_claim', table_name='transcription_jobs')
+    op.drop_index(op.f('ix_transcription_jobs_message_id'), table_name='transcription_jobs')
+    op.drop_index(op.f('ix_transcription_jobs_tenant_id'), table_name='transcription_jobs')
+    op.drop_index(op.f('ix_transcription_jobs_id'), table_name='transcription_jobs')
+    op.drop_table('transcription_jobs')
@@ -0,0 +1,28 @@
+"""Add transcript_segments to medical_records
+
+Revision ID: 8d4e2f6a9c31
+Revises: 3f1c9a7d2b10
+Create Date: 2026-10-17 10:03:51.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e2f6a9c31'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('medical_records', sa.Column('transcript_segments', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('medical_records', 'transcript_segments')
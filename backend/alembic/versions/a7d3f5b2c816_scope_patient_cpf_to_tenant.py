@@ -0,0 +1,38 @@
+"""Make patient CPF unique per tenant instead of globally
+
+Revision ID: a7d3f5b2c816
+Revises: f4c2e8a9b135
+Create Date: 2026-10-17 18:21:05.114302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f5b2c816'
+down_revision: Union[str, Sequence[str], None] = 'f4c2e8a9b135'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_patients_cpf', table_name='patients')
+    op.create_index('ix_patients_cpf', 'patients', ['cpf'], unique=False)
+    # Partial: any number of patients without CPF. NULLS NOT DISTINCT: untenanted
+    # (legacy) patients still share one CPF namespace, as under the old global index
+    op.create_index(
+        'uq_patients_tenant_cpf', 'patients', ['tenant_id', 'cpf'],
+        unique=True, postgresql_nulls_not_distinct=True,
+        postgresql_where=sa.text('cpf IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_patients_tenant_cpf', table_name='patients')
+    op.drop_index('ix_patients_cpf', table_name='patients')
+    op.create_index('ix_patients_cpf', 'patients', ['cpf'], unique=True)
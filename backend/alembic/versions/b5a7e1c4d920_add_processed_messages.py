@@ -0,0 +1,36 @@
+"""Add processed_messages idempotency table
+
+Revision ID: b5a7e1c4d920
+Revises: 8d4e2f6a9c31
+Create Date: 2026-10-17 11:27:40.551903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5a7e1c4d920'
+down_revision: Union[str, Sequence[str], None] = '8d4e2f6a9c31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('processed_messages',
+    sa.Column('message_id', sa.String(), nullable=False),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['transcription_jobs.id'], ),
+    sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_index(op.f('ix_processed_messages_created_at'), 'processed_messages', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_processed_messages_created_at'), table_name='processed_messages')
+    op.drop_table('processed_messages')
@@ -0,0 +1,50 @@
+"""Add outbound_messages outbox for WhatsApp replies
+
+Revision ID: b9e4d2a7f351
+Revises: a7d3f5b2c816
+Create Date: 2026-10-17 19:04:12.530117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4d2a7f351'
+down_revision: Union[str, Sequence[str], None] = 'a7d3f5b2c816'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbound_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chat_id', sa.String(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbound_messages_id'), 'outbound_messages', ['id'], unique=False)
+    op.create_index('ix_outbound_messages_claim', 'outbound_messages', ['status', 'available_at'], unique=False)
+    op.create_index('ix_outbound_messages_chat_status', 'outbound_messages', ['chat_id', 'status'], unique=False)
+    op.create_index('ix_outbound_messages_claimed_at', 'outbound_messages', ['claimed_at'], unique=False)
+    op.create_index('ix_outbound_messages_created_at', 'outbound_messages', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbound_messages_created_at', table_name='outbound_messages')
+    op.drop_index('ix_outbound_messages_claimed_at', table_name='outbound_messages')
+    op.drop_index('ix_outbound_messages_chat_status', table_name='outbound_messages')
+    op.drop_index('ix_outbound_messages_claim', table_name='outbound_messages')
+    op.drop_index(op.f('ix_outbound_messages_id'), table_name='outbound_messages')
+    op.drop_table('outbound_messages')
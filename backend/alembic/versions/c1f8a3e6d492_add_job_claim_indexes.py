@@ -0,0 +1,35 @@
+"""Add started_at/processing/finished_at indexes on transcription_jobs
+
+Revision ID: c1f8a3e6d492
+Revises: b9e4d2a7f351
+Create Date: 2026-10-17 19:40:26.218840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f8a3e6d492'
+down_revision: Union[str, Sequence[str], None] = 'b9e4d2a7f351'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_transcription_jobs_started_at', 'transcription_jobs', ['started_at'], unique=False)
+    op.create_index(
+        'ix_transcription_jobs_processing_tenant', 'transcription_jobs', ['tenant_id'],
+        unique=False, postgresql_where=sa.text("status = 'processing'"),
+    )
+    op.create_index('ix_transcription_jobs_finished_at', 'transcription_jobs', ['finished_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transcription_jobs_finished_at', table_name='transcription_jobs')
+    op.drop_index('ix_transcription_jobs_processing_tenant', table_name='transcription_jobs')
+    op.drop_index('ix_transcription_jobs_started_at', table_name='transcription_jobs')
@@ -0,0 +1,30 @@
+"""Add started_at to transcription_jobs for fair sharing
+
+Revision ID: c3e9d4b7a612
+Revises: b5a7e1c4d920
+Create Date: 2026-10-17 12:05:13.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9d4b7a612'
+down_revision: Union[str, Sequence[str], None] = 'b5a7e1c4d920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transcription_jobs', sa.Column('started_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_transcription_jobs_tenant_started', 'transcription_jobs', ['tenant_id', 'started_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transcription_jobs_tenant_started', table_name='transcription_jobs')
+    op.drop_column('transcription_jobs', 'started_at')
@@ -0,0 +1,34 @@
+"""Add batch_job_id to transcription_jobs for voice-note aggregation
+
+Revision ID: d8f2a6c1e457
+Revises: c3e9d4b7a612
+Create Date: 2026-10-17 12:48:31.772054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2a6c1e457'
+down_revision: Union[str, Sequence[str], None] = 'c3e9d4b7a612'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transcription_jobs', sa.Column('batch_job_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_transcription_jobs_batch_job_id'), 'transcription_jobs', ['batch_job_id'], unique=False)
+    op.create_foreign_key('fk_transcription_jobs_batch_job_id', 'transcription_jobs', 'transcription_jobs', ['batch_job_id'], ['id'])
+    op.create_index('ix_transcription_jobs_chat_pending', 'transcription_jobs', ['chat_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transcription_jobs_chat_pending', table_name='transcription_jobs')
+    op.drop_constraint('fk_transcription_jobs_batch_job_id', 'transcription_jobs', type_='foreignkey')
+    op.drop_index(op.f('ix_transcription_jobs_batch_job_id'), table_name='transcription_jobs')
+    op.drop_column('transcription_jobs', 'batch_job_id')
@@ -0,0 +1,56 @@
+"""Add normalized patient search keys
+
+Revision ID: e1b7c9f3a284
+Revises: d8f2a6c1e457
+Create Date: 2026-10-17 13:21:09.418226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from core.text import normalize_text
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b7c9f3a284'
+down_revision: Union[str, Sequence[str], None] = 'd8f2a6c1e457'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('patients', sa.Column('name_normalized', sa.String(), nullable=True))
+    op.add_column('patients', sa.Column('aliases_normalized', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+    # Backfill with the same normalization the ORM applies on write
+    conn = op.get_bind()
+    patients = sa.table(
+        'patients',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('aliases', postgresql.JSONB),
+        sa.column('name_normalized', sa.String),
+        sa.column('aliases_normalized', postgresql.JSONB),
+    )
+    for row in conn.execute(sa.select(patients.c.id, patients.c.name, patients.c.aliases)).fetchall():
+        aliases = sorted({normalize_text(a) for a in (row.aliases or []) if normalize_text(a)})
+        conn.execute(
+            patients.update()
+            .where(patients.c.id == row.id)
+            .values(name_normalized=normalize_text(row.name) or None, aliases_normalized=aliases)
+        )
+
+    op.create_index('ix_patients_tenant_name_normalized', 'patients', ['tenant_id', 'name_normalized'], unique=False)
+    op.create_index('ix_patients_aliases_normalized', 'patients', ['aliases_normalized'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'aliases_normalized': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patients_aliases_normalized', table_name='patients')
+    op.drop_index('ix_patients_tenant_name_normalized', table_name='patients')
+    op.drop_column('patients', 'aliases_normalized')
+    op.drop_column('patients', 'name_normalized')
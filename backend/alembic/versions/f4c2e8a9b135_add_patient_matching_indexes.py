@@ -0,0 +1,58 @@
+"""Add trigram, phonetic and phone indexes for patient matching
+
+Revision ID: f4c2e8a9b135
+Revises: e1b7c9f3a284
+Create Date: 2026-10-17 14:02:47.906315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from core.text import phone_key, phonetic_key
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c2e8a9b135'
+down_revision: Union[str, Sequence[str], None] = 'e1b7c9f3a284'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('patients', sa.Column('name_phonetic', sa.String(), nullable=True))
+    op.add_column('patients', sa.Column('phone_key', sa.String(), nullable=True))
+
+    # Backfill with the same keys the ORM computes on write
+    conn = op.get_bind()
+    patients = sa.table(
+        'patients',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('phone', sa.String),
+        sa.column('name_phonetic', sa.String),
+        sa.column('phone_key', sa.String),
+    )
+    for row in conn.execute(sa.select(patients.c.id, patients.c.name, patients.c.phone)).fetchall():
+        conn.execute(
+            patients.update()
+            .where(patients.c.id == row.id)
+            .values(name_phonetic=phonetic_key(row.name) or None, phone_key=phone_key(row.phone) or None)
+        )
+
+    op.create_index('ix_patients_name_trgm', 'patients', ['name_normalized'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name_normalized': 'gin_trgm_ops'})
+    op.create_index('ix_patients_name_phonetic', 'patients', ['name_phonetic'], unique=False,
+                    postgresql_ops={'name_phonetic': 'text_pattern_ops'})
+    op.create_index('ix_patients_tenant_phone_key', 'patients', ['tenant_id', 'phone_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_patients_tenant_phone_key', table_name='patients')
+    op.drop_index('ix_patients_name_phonetic', table_name='patients')
+    op.drop_index('ix_patients_name_trgm', table_name='patients')
+    op.drop_column('patients', 'phone_key')
+    op.drop_column('patients', 'name_phonetic')
@@ -1,28 +1,30 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Body
-from typing import Dict, Any, List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Body, Query, Header
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc
 from database import get_db
-from models import MedicalRecord, Appointment, Patient
-import shutil
+from models import MedicalRecord, Appointment, Patient, Tenant
+from services.transcription import TranscriptionService, get_transcription_service, resolve_profile
+from services.llm import LLMService, get_llm_service
+from services.transcript_format import slice_columnar
+from services.patient_cache import invalidate_patient
+from services.patient_matching import tenant_filter
 import os
-from pathlib import Path
+import asyncio
+import json
 import uuid
 import datetime
 
 router = APIRouter()
 
-UPLOAD_DIR = Path("temp")
+ALLOWED_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a", ".flac", ".webm", ".opus"}
 
-@router.post("/upload")
-async def upload_audio(file: UploadFile = File(...)):
+async def _read_upload(file: UploadFile) -> bytes:
     """
-    Upload an audio file to the server.
-    The file is saved temporarily in the 'temp' directory.
-    Supports: .mp3, .wav, .ogg (WhatsApp), .m4a, .flac, .webm
+    Validate the extension and read the upload into memory.
+    The bytes are decoded to PCM in memory by the transcription service; nothing is written to disk.
     """
-    # Validate file extension
-    ALLOWED_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a", ".flac", ".webm", ".opus"}
     file_extension = os.path.splitext(file.filename)[1].lower()
     
     if file_extension not in ALLOWED_EXTENSIONS:
@@ -30,34 +32,69 @@ async def upload_audio(file: UploadFile = File(...)):
             status_code=400, 
             detail=f"Invalid file format. Allowed formats: {', '.join(ALLOWED_EXTENSIONS)}"
         )
-    
-    if not os.path.exists(UPLOAD_DIR):
-        os.makedirs(UPLOAD_DIR)
-
-    # Generate a unique filename to avoid collisions
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
 
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        audio_bytes = await file.read()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
+        raise HTTPException(status_code=500, detail=f"Could not read file: {e}")
 
-    # --- Integration Start ---
-    from services.transcription import TranscriptionService
-    from services.llm import LLMService
+    if not audio_bytes:
+        raise HTTPException(status_code=400, detail="Empty audio file")
 
-    # Initialize services (In a real app, these should be dependencies or singletons)
-    # Note: Initializing here for simplicity as per current task scope.
-    transcription_service = TranscriptionService()
-    llm_service = LLMService()
+    return audio_bytes
+
+def get_optional_tenant_id(x_tenant_id: Optional[str] = Header(None)) -> Optional[uuid.UUID]:
+    if not x_tenant_id:
+        return None
+    try:
+        return uuid.UUID(x_tenant_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid X-Tenant-ID header")
+
+def get_profile_transcription_service(
+    profile: Optional[str] = Query(None, description="Transcription profile: fast, balanced or accurate."),
+    tenant_id: Optional[uuid.UUID] = Depends(get_optional_tenant_id),
+    db: Session = Depends(get_db),
+) -> TranscriptionService:
+    """
+    Resolve the TranscriptionService for this request: `?profile=` wins,
+    otherwise the tenant's `config.transcription_profile`, otherwise the default.
+    """
+    tenant_config = None
+    if not profile and tenant_id:
+        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).first()
+        tenant_config = tenant.config if tenant else None
+    try:
+        return get_transcription_service(resolve_profile(profile, tenant_config))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/upload")
+async def upload_audio(
+    file: UploadFile = File(...),
+    transcription_service: TranscriptionService = Depends(get_profile_transcription_service),
+    llm_service: LLMService = Depends(get_llm_service),
+):
+    """
+    Upload an audio file and transcribe it.
+    The audio is decoded in memory (no temp file).
+    Supports: .mp3, .wav, .ogg (WhatsApp), .m4a, .flac, .webm
+    Optional `?profile=fast|balanced|accurate` (or tenant config via X-Tenant-ID).
+    """
+    audio_bytes = await _read_upload(file)
+
+    # --- Integration Start ---
+    # Services are process-wide singletons: the Whisper model stays warm between uploads
+    # and concurrent uploads share it (bounded by WHISPER_POOL_SIZE) in worker threads.
 
     # 1. Transcribe
     try:
-        transcription_text = transcription_service.transcribe(str(file_path))
+        transcription_text = await asyncio.to_thread(transcription_service.transcribe, audio_bytes)
     except Exception as e:
-        return {"filename": unique_filename, "error": f"Transcription failed: {e}"}
+        return {"filename": file.filename, "error": f"Transcription failed: {e}"}
 
     # 2. Process with LLM
     try:
@@ -67,20 +104,47 @@ async def upload_audio(file: UploadFile = File(...)):
         Não dê instruções ou explicações adicionais.
         Forneça apenas o texto corrigido.
         """
-        llm_response = llm_service.process_text(transcription_text, prompt)
+        llm_response = await asyncio.to_thread(llm_service.process_text, transcription_text, prompt)
     except Exception as e:
         llm_response = f"LLM processing failed: {e}"
 
-    # Cleanup (Optional: remove file after processing)
-    # os.remove(file_path)
-
     return {
-        "filename": unique_filename,
-        "file_path": str(file_path),
+        "filename": file.filename,
         "transcription": transcription_text,
         "llm_analysis": llm_response
     }
 
+@router.post("/upload/stream")
+async def upload_audio_stream(
+    file: UploadFile = File(...),
+    transcription_service: TranscriptionService = Depends(get_profile_transcription_service),
+):
+    """
+    Upload an audio file and stream its transcription as Server-Sent Events.
+    Emits one `segment` event per Whisper segment ({"start", "end", "text"}) as soon as
+    it is decoded, then a `done` event with the full text (or an `error` event).
+    No LLM post-processing is applied on this route.
+    """
+    audio_bytes = await _read_upload(file)
+
+    def event_stream():
+        texts = []
+        try:
+            # Sync generator: Starlette iterates it in the threadpool, off the event loop
+            for segment in transcription_service.iter_segments(audio_bytes):
+                texts.append(segment["text"])
+                yield _sse("segment", segment)
+        except Exception as e:
+            yield _sse("error", {"filename": file.filename, "error": f"Transcription failed: {e}"})
+            return
+        yield _sse("done", {"filename": file.filename, "transcription": " ".join(texts)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/medical-records")
 def list_medical_records(db: Session = Depends(get_db)):
     """
@@ -143,6 +207,29 @@ def get_medical_record(record_id: int, db: Session = Depends(get_db)):
         "created_at": record.created_at
     }
 
+@router.get("/medical-records/{record_id}/transcript")
+def get_medical_record_transcript(
+    record_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    words: bool = Query(False, description="Include word-level timestamps for the returned segments."),
+    db: Session = Depends(get_db),
+):
+    """
+    Page through a record's timestamped transcript (segments with avg_logprob / no_speech_prob,
+    and optionally their words) in columnar form, so long consultations can be rendered lazily.
+    """
+    row = db.query(MedicalRecord.id, MedicalRecord.transcript_segments).filter(MedicalRecord.id == record_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Medical record not found")
+    if not row.transcript_segments:
+        raise HTTPException(status_code=404, detail="No timestamped transcript for this record")
+
+    return {
+        "id": row.id,
+        **slice_columnar(row.transcript_segments, offset=offset, limit=limit, include_words=words),
+    }
+
 @router.get("/patients")
 def list_patients(db: Session = Depends(get_db)):
     """
@@ -161,9 +248,13 @@ def list_patients(db: Session = Depends(get_db)):
     ]
 
 @router.post("/patients")
-def create_patient(payload: Dict[str, Any] = Body(...), db: Session = Depends(get_db)):
+def create_patient(
+    payload: Dict[str, Any] = Body(...),
+    tenant_id: Optional[uuid.UUID] = Depends(get_optional_tenant_id),
+    db: Session = Depends(get_db),
+):
     """
-    Cria um novo paciente.
+    Cria um novo paciente (na clínica do header X-Tenant-ID, se informado).
     Obrigatório: nome, cpf.
     Opcional: phone, birth_date.
     """
@@ -178,13 +269,14 @@ def create_patient(payload: Dict[str, Any] = Body(...), db: Session = Depends(ge
     if not clean_cpf:
         raise HTTPException(status_code=400, detail="Invalid CPF format")
 
-    # Check for existing CPF
-    existing = db.query(Patient).filter(Patient.cpf == clean_cpf).first()
+    # Check for existing CPF (unique per tenant)
+    existing = db.query(Patient).filter(tenant_filter(tenant_id), Patient.cpf == clean_cpf).first()
     if existing:
         raise HTTPException(status_code=400, detail="CPF already registered")
 
     # Create Patient
     patient = Patient(
+        tenant_id=tenant_id,
         name=name, 
         cpf=clean_cpf, 
         phone=payload.get("phone"),
@@ -199,6 +291,7 @@ def create_patient(payload: Dict[str, Any] = Body(...), db: Session = Depends(ge
 
     try:
         db.add(patient)
+        invalidate_patient(db, patient.tenant_id)
         db.commit()
         db.refresh(patient)
         return {
@@ -247,7 +340,7 @@ def update_patient(patient_id: int, payload: Dict[str, Any] = Body(...), db: Ses
         if new_cpf_raw:
             new_clean_cpf = ''.join(filter(str.isdigit, new_cpf_raw))
             if new_clean_cpf != patient.cpf:
-                 existing = db.query(Patient).filter(Patient.cpf == new_clean_cpf).first()
+                 existing = db.query(Patient).filter(tenant_filter(patient.tenant_id), Patient.cpf == new_clean_cpf).first()
                  if existing:
                      raise HTTPException(status_code=400, detail="CPF already registered to another patient")
                  patient.cpf = new_clean_cpf
@@ -273,6 +366,7 @@ def update_patient(patient_id: int, payload: Dict[str, Any] = Body(...), db: Ses
 
     try:
         db.add(patient)
+        invalidate_patient(db, patient.tenant_id)
         db.commit()
         db.refresh(patient)
         return {
@@ -414,6 +508,8 @@ def update_medical_record(
                 pass # Ignore invalid age
     
     try:
+        if patient_updated and patient_ref:
+            invalidate_patient(db, patient_ref.tenant_id)
         db.commit()
         db.refresh(record)
         if patient_updated and patient_ref:
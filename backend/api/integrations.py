@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
 from core.ai_gateway import GeminiService
 from core.config import settings
+from core.http import get_http_client, media_download_timeout
 from database import get_db
 import httpx
 
@@ -16,18 +17,18 @@ gemini = GeminiService(api_key=settings.GEMINI_API_KEY)
 @router.post("/chatbot-webhook")
 async def chatbot_webhook(
     payload: dict = Body(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    client: httpx.AsyncClient = Depends(get_http_client)
 ):
     media_url = payload.get("media_url")
     if not media_url:
         raise HTTPException(status_code=400, detail="Missing media_url")
     
     # Download audio from Story2Scale
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(media_url)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to fetch audio")
-        audio_content = resp.content
+    resp = await client.get(media_url, timeout=media_download_timeout())
+    if resp.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to fetch audio")
+    audio_content = resp.content
 
     # Process via Gemini
     ai_response = await gemini.process_medical_audio(audio_content)
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Request, HTTPException
 import httpx
 import os
-from pathlib import Path
-import uuid
 import traceback
-import re
 import asyncio
+import uuid
+from typing import List, Optional, Tuple
+from core.config import settings
+from core.context import chat_context, tenant_context
+from core.http import get_http_client
 from database import SessionLocal
-from models import MedicalRecord
+from models import Tenant
+from services.job_queue import enqueue_transcription_job
+from services.idempotency import seen_messages
+from services.job_scheduling import LANE_NAMES, audio_duration, classify_priority, resolve_tenant_id
+from services.media_download import MediaTooLargeError, download_media
+from services.transcription import resolve_profile
+from services.waha import send_message
 
 router = APIRouter()
 
@@ -15,9 +23,13 @@ router = APIRouter()
 WAHA_BASE_URL = os.getenv("WAHA_BASE_URL", "http://waha:3000")
 
 @router.post("/webhook/whatsapp")
-async def whatsapp_webhook(request: Request, background_tasks: BackgroundTasks):
+async def whatsapp_webhook(request: Request):
     """
     Receive Webhook events from WAHA (WhatsApp HTTP API).
+    Audio messages are persisted to the transcription job queue and processed
+    by the worker pool (workers/transcription_worker.py), not in this process.
+    Each WAHA message id is queued at most once, so redeliveries are acknowledged
+    with 200 without running Whisper/LLM again.
     """
     try:
         data = await request.json()
@@ -66,6 +78,10 @@ async def whatsapp_webhook(request: Request, background_tasks: BackgroundTasks):
             if isinstance(message_id, dict):
                 message_id = message_id.get("_serialized")
             
+            if message_id and message_id in seen_messages:
+                print(f"🔁 Duplicate delivery for message {message_id}, already queued")
+                return {"status": "duplicate"}
+
             if message_id:
                 # Check for explicit mediaUrl (useful for testing/simulation)
                 media_url = payload.get("mediaUrl")
@@ -74,7 +90,31 @@ async def whatsapp_webhook(request: Request, background_tasks: BackgroundTasks):
                     media_url = payload.get("media", {}).get("url")
 
                 chat_id = payload.get("from")
-                background_tasks.add_task(handle_audio_message, message_id, media_url, chat_id)
+                # Lane by message type and length; tenant by the WAHA session that received it
+                priority = classify_priority(msg_type, audio_duration(payload))
+                session = data.get("session")
+
+                def enqueue():
+                    db = SessionLocal()
+                    try:
+                        tenant_id = resolve_tenant_id(db, session)
+                        job = enqueue_transcription_job(db, message_id, media_url, chat_id, priority=priority, tenant_id=tenant_id)
+                        return job.id if job is not None else None
+                    finally:
+                        db.close()
+
+                try:
+                    job_id = await asyncio.to_thread(enqueue)
+                except Exception as e:
+                    print(f"❌ Failed to queue message {message_id}: {e}")
+                    # Non-2xx makes WAHA redeliver the event later; nothing was persisted yet
+                    raise HTTPException(status_code=503, detail="Queue unavailable")
+
+                seen_messages.add(message_id)
+                if job_id is None:
+                    print(f"🔁 Duplicate delivery for message {message_id}, already queued")
+                    return {"status": "duplicate"}
+                print(f"📥 Queued transcription job {job_id} for message {message_id} (lane: {LANE_NAMES.get(priority, priority)})")
         else:
             message_id = payload.get("id")
             if isinstance(message_id, dict):
@@ -88,172 +128,163 @@ async def whatsapp_webhook(request: Request, background_tasks: BackgroundTasks):
 
     return {"status": "success"}
 
-async def handle_audio_message(message_id: str, media_url: str = None, chat_id: str = None):
+def _media_request(message_id: str, media_url: str = None):
+    """Download URL and auth headers for a message's media."""
+    headers = {}
+    download_url = ""
+    api_key = os.getenv("WAHA_API_KEY")
+
+    # Cenário Simulação (Bypass) ou GOWS (URL direta)
+    if media_url and media_url.startswith("http"):
+        print(f"Using provided mediaUrl: {media_url}")
+        download_url = media_url
+        
+        # Docker Fix: localhost -> waha
+        # O GOWS retorna localhost, mas dentro do docker precisamos acessar pelo nome do container
+        if "localhost" in download_url and "waha" in WAHA_BASE_URL:
+             download_url = download_url.replace("localhost", "waha")
+             print(f"🔄 Adjusted Docker URL: {download_url}")
+        
+        # Se for URL interna do WAHA, precisa de autenticação
+        if "waha" in download_url or "localhost" in download_url:
+             if api_key:
+                 headers["X-Api-Key"] = api_key
+    else:
+        # Cenário Produção (WAHA - Fallback)
+        # URL: http://waha:3000/api/files/{message_id}
+        download_url = f"{WAHA_BASE_URL}/api/files/{message_id}"
+        
+        # Autenticação Obrigatória
+        if api_key:
+            headers["X-Api-Key"] = api_key
+        
+        print(f"Downloading from WAHA (Constructed): {download_url}")
+    return download_url, headers
+
+async def handle_audio_message(message_id: str, media_url: str = None, chat_id: str = None, client: Optional[httpx.AsyncClient] = None):
     """
     Download audio from WAHA and start transcription pipeline.
+    Runs in the worker process; errors are re-raised so the job can be retried.
     """
+    await handle_audio_messages([(message_id, media_url)], chat_id, client)
+
+def _tenant_config(tenant_id: Optional[uuid.UUID]) -> Optional[dict]:
+    if tenant_id is None:
+        return None
+    db = SessionLocal()
     try:
-        print(f"Processing audio for message: {message_id}")
-        
-        # 1. Determine URL and Auth
-        headers = {}
-        download_url = ""
-        api_key = os.getenv("WAHA_API_KEY")
+        tenant = db.query(Tenant.config).filter(Tenant.id == tenant_id).first()
+        return tenant.config if tenant else None
+    finally:
+        db.close()
 
-        # Cenário Simulação (Bypass) ou GOWS (URL direta)
-        if media_url and media_url.startswith("http"):
-            print(f"Using provided mediaUrl: {media_url}")
-            download_url = media_url
-            
-            # Docker Fix: localhost -> waha
-            # O GOWS retorna localhost, mas dentro do docker precisamos acessar pelo nome do container
-            if "localhost" in download_url and "waha" in WAHA_BASE_URL:
-                 download_url = download_url.replace("localhost", "waha")
-                 print(f"🔄 Adjusted Docker URL: {download_url}")
-            
-            # Se for URL interna do WAHA, precisa de autenticação
-            if "waha" in download_url or "localhost" in download_url:
-                 if api_key:
-                     headers["X-Api-Key"] = api_key
+async def handle_audio_messages(notes: List[Tuple[str, Optional[str]]], chat_id: str = None, client: Optional[httpx.AsyncClient] = None, tenant_id: Optional[uuid.UUID] = None):
+    """
+    Process consecutive voice notes of one chat, given as (message_id, media_url) in
+    arrival order, as a single consultation: downloads run concurrently, the notes are
+    transcribed in parallel and joined in order, and the agent runs once.
+    Patient lookups and new records are scoped to `tenant_id`, and the tenant's
+    `config["transcription_profile"]` picks the Whisper profile.
+    """
+    message_ids = ", ".join(message_id for message_id, _ in notes)
+    try:
+        print(f"Processing audio for message(s): {message_ids}")
+        client = client or get_http_client()
+
+        # 1. Download (streamed; small notes stay in memory, long ones spill to a temp file)
+        async def fetch(message_id: str, media_url: Optional[str]):
+            download_url, headers = _media_request(message_id, media_url)
+            try:
+                return await download_media(client, download_url, headers)
+            except MediaTooLargeError as e:
+                # Retrying won't make it smaller: carry on without this note
+                print(f"❌ Skipping message {message_id}: {e}")
+                return None
+
+        downloads = await asyncio.gather(*(fetch(message_id, media_url) for message_id, media_url in notes), return_exceptions=True)
+        medias = [d for d in downloads if d is not None and not isinstance(d, BaseException)]
+        failed = [d for d in downloads if isinstance(d, BaseException)]
+        if failed:
+            for media in medias:
+                media.cleanup()
+            raise failed[0]
+        if not medias:
+            # Every note was over the size limit: tell the sender instead of dropping it silently
+            if chat_id:
+                await send_whatsapp_message(
+                    chat_id,
+                    f"Não consegui processar o áudio: o arquivo excede o limite de {settings.MEDIA_MAX_DOWNLOAD_MB:g} MB. "
+                    "Por favor, envie gravações mais curtas.",
+                )
+            return
+        
+        # 2. Call LangGraph Orchestrator
+        # The agent graph includes the TranscriptionService node, which decodes the
+        # audio in memory (no temp file round trip) unless it was spooled to disk.
+        print(f"Invoking Agent for message(s) {message_ids}")
+        
+        from agent.graph import app as agent_app
+        
+        inputs = {
+            "chat_id": chat_id,
+            # Tenant.config["transcription_profile"], else the default profile
+            "transcription_profile": resolve_profile(tenant_config=await asyncio.to_thread(_tenant_config, tenant_id)),
+        }
+        if len(medias) > 1:
+            inputs["audio_parts"] = [media.audio for media in medias]
+        elif medias[0].data is not None:
+            inputs["audio_bytes"] = medias[0].data
         else:
-            # Cenário Produção (WAHA - Fallback)
-            # URL: http://waha:3000/api/files/{message_id}
-            download_url = f"{WAHA_BASE_URL}/api/files/{message_id}"
-            
-            # Autenticação Obrigatória
-            if api_key:
-                headers["X-Api-Key"] = api_key
-            
-            print(f"Downloading from WAHA (Constructed): {download_url}")
+            inputs["audio_path"] = medias[0].path
         
-        async with httpx.AsyncClient() as client:
-            # Download
-            response = await client.get(download_url, headers=headers, timeout=60.0)
-            response.raise_for_status()
-            
-            # 2. Save to temp file
-            upload_dir = Path("temp")
-            upload_dir.mkdir(exist_ok=True)
-            
-            # Try to guess extension from content-type
-            content_type = response.headers.get("content-type", "")
-            ext = ".ogg" # WhatsApp voice notes are usually OGG/Opus
-            if "mp3" in content_type:
-                ext = ".mp3"
-            elif "wav" in content_type:
-                ext = ".wav"
-                
-            filename = f"{uuid.uuid4()}{ext}"
-            file_path = upload_dir / filename
-            
-            with open(file_path, "wb") as f:
-                f.write(response.content)
-            
-            print(f"Audio saved to {file_path}")
-            
-            # 3. Call LangGraph Orchestrator
-            # The agent graph includes the TranscriptionService node.
-            print(f"Invoking Agent for {file_path}")
-            
-            from agent.graph import app as agent_app
-            
-            inputs = {
-                "audio_path": str(file_path.absolute()),
-                "chat_id": chat_id
-            }
-            
-            # Run the graph
-            result = agent_app.invoke(inputs)
-            
-            # Post-processing: Update full_transcription (Enrichment)
-            transcribed_text = result.get("transcribed_text")
-            messages = result.get("messages", [])
-            
-            if transcribed_text:
-                # Extract IDs from tool outputs
-                ids_to_update = []
-                for msg in messages:
-                    if hasattr(msg, 'content') and isinstance(msg.content, str):
-                        # Regex to find "ID do Registro: <number>" or variations
-                        # Matches: "ID: 123", "ID do Registro: 123", "Registro: 123"
-                        matches = re.findall(r"(?:ID(?: do Registro)?|Registro)[:\s]+(\d+)", msg.content, re.IGNORECASE)
-                        for m in matches:
-                            ids_to_update.append(int(m))
+        # Run the graph (tools read the tenant from context)
+        tenant_context.set(tenant_id)
+        chat_context.set(chat_id)
+        try:
+            result = await agent_app.ainvoke(inputs)
+        finally:
+            for media in medias:
+                media.cleanup()
+        
+        # The record (with transcript) was saved by the agent's tool in one transaction
+        record_ids = result.get("record_ids") or []
+        if record_ids:
+            print(f"✅ Consultation saved as record(s) {record_ids}")
+        
+        messages = result.get("messages", [])
+        error = result.get("error")
+        
+        if error:
+            print(f"Agent finished with ERROR: {error}")
+        else:
+            print(f"Agent finished successfully.")
+            if messages:
+                # Extract the final response from the agent
+                last_msg = messages[-1]
+                final_text = last_msg.content
+                print(f"Final Response: {final_text[:100]}...")
                 
-                if ids_to_update:
-                    print(f"🔄 Updating transcription for Records: {ids_to_update}")
-                    
-                    def update_db():
-                        try:
-                            db = SessionLocal()
-                            # Perform explicit update
-                            from sqlalchemy import update
-                            stmt = update(MedicalRecord).where(MedicalRecord.id.in_(ids_to_update)).values(
-                                full_transcription=transcribed_text
-                            )
-                            db.execute(stmt)
-                            db.commit()
-                            print(f"✅ Transcription updated successfully for IDs {ids_to_update}")
-                        except Exception as db_err:
-                            print(f"❌ Failed to update transcription: {db_err}")
-                            traceback.print_exc()
-                        finally:
-                            db.close()
-                    
-                    # Run blocking DB update in thread
-                    await asyncio.to_thread(update_db)
+                # 3. Send Response back to WhatsApp
+                if chat_id:
+                    try:
+                        await send_whatsapp_message(chat_id, final_text)
+                    except Exception as send_err:
+                         print(f"Warning: Failed to send WhatsApp response (likely invalid test number): {send_err}")
+                else:
+                    print("Warning: No chat_id provided, cannot send response.")
             
-            messages = result.get("messages", [])
-            error = result.get("error")
-            
-            if error:
-                print(f"Agent finished with ERROR: {error}")
-            else:
-                print(f"Agent finished successfully.")
-                if messages:
-                    # Extract the final response from the agent
-                    last_msg = messages[-1]
-                    final_text = last_msg.content
-                    print(f"Final Response: {final_text[:100]}...")
-                    
-                    # 4. Send Response back to WhatsApp
-                    if chat_id:
-                        try:
-                            await send_whatsapp_message(chat_id, final_text)
-                        except Exception as send_err:
-                             print(f"Warning: Failed to send WhatsApp response (likely invalid test number): {send_err}")
-                    else:
-                        print("Warning: No chat_id provided, cannot send response.")
-            
-            # Cleanup temp file (Optional, but good practice if not needed anymore)
-            # os.remove(file_path) 
-                
     except Exception as e:
-        print(f"Error processing audio message {message_id}: {e}")
+        print(f"Error processing audio message(s) {message_ids}: {e}")
         traceback.print_exc()
+        raise
 
 async def send_whatsapp_message(chat_id: str, text: str):
     """
-    Send text message via WAHA.
+    Queue a text reply via WAHA. Returns once it is stored in the outbox, so the job
+    can complete without waiting on delivery and the reply survives restarts;
+    delivery (human-like delay, rate limiting, retries) happens in the outbound dispatcher.
     """
-    url = f"{WAHA_BASE_URL}/api/sendText"
-    headers = {"Content-Type": "application/json"}
-    api_key = os.getenv("WAHA_API_KEY")
-    if api_key:
-        headers["X-Api-Key"] = api_key
-        
-    payload = {
-        "session": "default",
-        "chatId": chat_id,
-        "text": text
-    }
-    
-    print(f"Sending response to {chat_id}...")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers, timeout=10.0)
-            response.raise_for_status()
-            print("Message sent successfully!")
-        except Exception as e:
-            print(f"Failed to send WhatsApp message: {e}")
+    print(f"Queueing response to {chat_id}...")
+    result = await send_message(chat_id, text)
+    if "error" in result:
+        print(f"Failed to queue WhatsApp message: {result['error']}")
@@ -0,0 +1,213 @@
+"""
+Transcription throughput benchmark.
+
+Runs TranscriptionService over a fixed set of audio fixtures for every combination
+of model size, compute type, beam size and CPU thread count, and prints a JSON
+report with real-time factor, latency percentiles, model load time and peak RSS.
+
+Fixtures are either loaded from --fixtures-dir (any format PyAV decodes) or
+synthesized deterministically: voiced, speech-like bursts (harmonics with a
+syllable-rate envelope) separated by pauses. Synthetic audio exercises the
+decoder/VAD path realistically for throughput, not accuracy.
+
+No network or GPU is used: models must already be in the local Hugging Face
+cache, or pass a local CTranslate2 model directory as the model size.
+
+    python -m benchmarks.transcription_bench --models small medium --beams 1 5 --threads 4 8
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+from queue import Empty
+from typing import Dict, List
+
+import numpy as np
+
+# Allow running as a script from the backend directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio import SAMPLING_RATE, to_pcm
+
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a", ".flac", ".webm", ".opus"}
+
+
+def synth_speech_like(seconds: float, seed: int = 0, sampling_rate: int = SAMPLING_RATE) -> np.ndarray:
+    """Deterministic speech-like signal: voiced bursts of 0.3-2.5 s with 0.2-1.2 s pauses."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sampling_rate)
+    audio = np.zeros(total, dtype=np.float32)
+    pos = 0
+    while pos < total:
+        burst = int(rng.uniform(0.3, 2.5) * sampling_rate)
+        end = min(total, pos + burst)
+        t = np.arange(end - pos) / sampling_rate
+        f0 = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sampling_rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+        envelope = 0.5 * (1 - np.cos(2 * np.pi * rng.uniform(3, 6) * t))  # ~syllable rate
+        noise = rng.normal(0, 0.05, len(t))
+        audio[pos:end] = (0.2 * voiced * envelope + noise * envelope).astype(np.float32)
+        pos = end + int(rng.uniform(0.2, 1.2) * sampling_rate)
+    return audio
+
+
+def load_fixtures(fixtures_dir: str, synthetic_lengths: List[float]) -> Dict[str, np.ndarray]:
+    fixtures = {}
+    if fixtures_dir:
+        for path in sorted(Path(fixtures_dir).iterdir()):
+            if path.suffix.lower() in AUDIO_EXTENSIONS:
+                fixtures[path.name] = to_pcm(str(path))
+    for i, seconds in enumerate(synthetic_lengths):
+        fixtures[f"synthetic_{int(seconds)}s"] = synth_speech_like(seconds, seed=i)
+    return fixtures
+
+
+def percentile(values: List[float], pct: float) -> float:
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_config(config: Dict, fixtures: Dict[str, np.ndarray], repeats: int, parallel: bool, queue):
+    """Runs in a fresh process so load time and peak RSS belong to this config only."""
+    from core.config import settings
+    settings.TRANSCRIPTION_CACHE_ENABLED = False  # Measure Whisper, not the cache
+
+    from services.model_registry import WhisperModelRegistry
+    from services.transcription import TranscriptionService
+
+    try:
+        service = TranscriptionService(
+            model_size=config["model_size"],
+            compute_type=config["compute_type"],
+            cpu_threads=config["cpu_threads"],
+            beam_size=config["beam_size"],
+            registry=WhisperModelRegistry(pool_size=config["pool_size"]),
+        )
+        started = time.perf_counter()
+        service.load_model()
+        load_seconds = time.perf_counter() - started
+
+        results = {}
+        all_latencies = []
+        total_audio = total_compute = 0.0
+        for name, audio in fixtures.items():
+            duration = len(audio) / SAMPLING_RATE
+            latencies = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                service.transcribe_segments(audio, parallel=parallel)
+                latencies.append(time.perf_counter() - started)
+            all_latencies.extend(latencies)
+            total_audio += duration * repeats
+            total_compute += sum(latencies)
+            results[name] = {
+                "audio_seconds": round(duration, 2),
+                "latency_p50": round(percentile(latencies, 50), 3),
+                "latency_max": round(max(latencies), 3),
+                "rtf": round(percentile(latencies, 50) / duration, 4) if duration else None,
+            }
+
+        queue.put({
+            **config,
+            "parallel": parallel,
+            "load_seconds": round(load_seconds, 2),
+            "rtf": round(total_compute / total_audio, 4) if total_audio else None,
+            "latency_p50": round(percentile(all_latencies, 50), 3),
+            "latency_p90": round(percentile(all_latencies, 90), 3),
+            "latency_p99": round(percentile(all_latencies, 99), 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "fixtures": results,
+        })
+    except Exception as e:
+        queue.put({**config, "error": f"{type(e).__name__}: {e}"})
+
+
+def wait_for_result(config: Dict, process, queue, timeout: float) -> Dict:
+    """
+    The child's report, or an error entry if it died without reporting (e.g. OOM
+    killed loading a large model) or ran past `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = queue.get(timeout=1.0)
+            break
+        except Empty:
+            pass
+        if not process.is_alive():
+            # It may have reported right before exiting
+            try:
+                result = queue.get(timeout=1.0)
+            except Empty:
+                result = {**config, "error": f"Benchmark process exited with code {process.exitcode} without a result"}
+            break
+        if time.monotonic() > deadline:
+            process.terminate()
+            result = {**config, "error": f"Timed out after {timeout:.0f}s"}
+            break
+    process.join()
+    if "error" in result:
+        print(f"  failed: {result['error']}", file=sys.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper transcription benchmark")
+    parser.add_argument("--models", nargs="+", default=["small", "medium"])
+    parser.add_argument("--compute-types", nargs="+", default=["int8"])
+    parser.add_argument("--beams", nargs="+", type=int, default=[1, 5])
+    parser.add_argument("--threads", nargs="+", type=int, default=[0], help="cpu_threads per model (0 = CTranslate2 default)")
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--lengths", nargs="*", type=float, default=[10, 60, 300], help="Synthetic fixture lengths in seconds")
+    parser.add_argument("--fixtures-dir", default=None, help="Directory with real audio fixtures")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--parallel", action="store_true", help="Use VAD chunking + parallel transcription")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds to wait for one configuration before giving up on it")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures_dir, args.lengths)
+    if not fixtures:
+        parser.error("No fixtures: pass --lengths and/or --fixtures-dir")
+
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for model_size, compute_type, beam_size, cpu_threads in itertools.product(args.models, args.compute_types, args.beams, args.threads):
+        config = {
+            "model_size": model_size,
+            "compute_type": compute_type,
+            "beam_size": beam_size,
+            "cpu_threads": cpu_threads,
+            "pool_size": args.pool_size,
+        }
+        print(f"Running {config}...", file=sys.stderr)
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_config, args=(config, fixtures, args.repeats, args.parallel, queue))
+        process.start()
+        runs.append(wait_for_result(config, process, queue, args.timeout))
+
+    report = {
+        "host": {"cpu_count": os.cpu_count(), "python": sys.version.split()[0]},
+        "fixtures": {name: round(len(audio) / SAMPLING_RATE, 2) for name, audio in fixtures.items()},
+        "repeats": args.repeats,
+        "runs": runs,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Webhook load simulator and end-to-end latency benchmark.
+
+Replays synthetic WAHA `message` events (voice notes) against
+/api/webhook/whatsapp at a fixed rate and measures, per message, the time from
+webhook POST until the reply reaches WAHA's sendText.
+
+A local stand-in WAHA server plays both roles the backend talks to:
+  GET  /api/files/{message_id}  serves a synthetic speech-like WAV for that message
+  POST /api/sendText            records the reply (matched back by chatId)
+
+Every message uses its own chatId and a distinct audio seed, so replies map 1:1 to
+events and the transcription cache never short-circuits Whisper. Events rotate over
+--clinics WAHA sessions to exercise per-tenant fair sharing.
+
+Start the backend and worker pointing at the stand-in server, with the
+voice-note aggregation window and the human-like reply delay turned off (each
+chat sends one note, so the default 15 s window would only add idle time to
+queue_wait and end_to_end), e.g.
+
+    export WAHA_BASE_URL=http://127.0.0.1:3900 AGGREGATION_WINDOW_SECONDS=0 \\
+        OUTBOUND_MIN_DELAY_SECONDS=0 OUTBOUND_MAX_DELAY_SECONDS=0
+    uvicorn main:app &
+    python -m workers.transcription_worker &
+    python -m benchmarks.webhook_load --rate 2 --messages 100 --clinics 4 --lengths 15 60
+
+Stages reported (seconds):
+  ack            webhook POST -> HTTP response
+  until_fetch    webhook POST -> worker starts downloading the media
+  fetch_to_reply media request -> sendText received (download + Whisper + agent + dispatch)
+  end_to_end     webhook POST -> sendText received
+The report's config block records --aggregation-window; pass the backend's
+AGGREGATION_WINDOW_SECONDS if it is not 0.
+With --database-url, stages from transcription_jobs are added:
+  queue_wait     job created -> claimed by a worker
+  processing     claimed -> job finished
+  reply_delivery job finished -> sendText received (outbound dispatcher)
+"""
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# Allow running as a script from the backend directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.transcription_bench import percentile, synth_speech_like
+from services.audio import SAMPLING_RATE
+
+
+def wav_bytes(audio: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLING_RATE)
+        wav.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+class FakeWaha:
+    """Stand-in WAHA server running in a background thread."""
+
+    def __init__(self, host: str, port: int):
+        self.media_seconds: Dict[str, float] = {}  # message_id -> audio length
+        self.media_seeds: Dict[str, int] = {}
+        self.fetched_at: Dict[str, float] = {}     # message_id -> first media request
+        self.replied_at: Dict[str, float] = {}     # chatId -> first sendText
+        self.replies: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if not self.path.startswith("/api/files/"):
+                    self.send_error(404)
+                    return
+                message_id = self.path.rsplit("/", 1)[-1]
+                with fake.lock:
+                    fake.fetched_at.setdefault(message_id, time.time())
+                    seconds = fake.media_seconds.get(message_id)
+                    seed = fake.media_seeds.get(message_id, 0)
+                if seconds is None:
+                    self.send_error(404)
+                    return
+                body = wav_bytes(synth_speech_like(seconds, seed=seed))
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/wav")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/sendText":
+                    with fake.lock:
+                        chat_id = payload.get("chatId", "")
+                        fake.replied_at.setdefault(chat_id, time.time())
+                        fake.replies.setdefault(chat_id, payload.get("text", ""))
+                body = json.dumps({"id": str(uuid.uuid4())}).encode()
+                self.send_response(201)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def make_event(message_id: str, chat_id: str, session: str, seconds: float) -> Dict:
+    """A WAHA `message` event for a push-to-talk voice note, without mediaUrl (backend fetches /api/files)."""
+    return {
+        "event": "message",
+        "session": session,
+        "payload": {
+            "id": message_id,
+            "from": chat_id,
+            "hasMedia": True,
+            "type": "ptt",
+            "media": {"mimetype": "audio/ogg; codecs=opus"},
+            "_data": {"type": "ptt", "mimetype": "audio/ogg; codecs=opus", "duration": str(int(seconds))},
+        },
+    }
+
+
+async def send_events(args, fake: FakeWaha, run_id: str) -> List[Dict]:
+    messages = []
+    interval = 1.0 / args.rate
+    async with httpx.AsyncClient(timeout=30.0) as client:
+
+        async def post(message: Dict):
+            message["sent_at"] = time.time()
+            try:
+                response = await client.post(args.url, json=message.pop("event"))
+                message["status"] = response.status_code
+            except httpx.HTTPError as e:
+                message["status"] = f"{type(e).__name__}"
+            message["acked_at"] = time.time()
+
+        tasks = []
+        started = time.perf_counter()
+        for i in range(args.messages):
+            seconds = args.lengths[i % len(args.lengths)]
+            message_id = f"load_{run_id}_{i}"
+            chat_id = f"55{run_id[:4].encode().hex()[:6]}{i:06d}@c.us"
+            session = f"clinic-{i % args.clinics}"
+            with fake.lock:
+                fake.media_seconds[message_id] = seconds
+                fake.media_seeds[message_id] = i
+            message = {
+                "message_id": message_id,
+                "chat_id": chat_id,
+                "session": session,
+                "audio_seconds": seconds,
+                "event": make_event(message_id, chat_id, session, seconds),
+            }
+            messages.append(message)
+            tasks.append(asyncio.create_task(post(message)))
+            # Fixed-rate schedule, independent of how long each POST takes
+            await asyncio.sleep(max(0.0, started + (i + 1) * interval - time.perf_counter()))
+        await asyncio.gather(*tasks)
+    return messages
+
+
+def wait_for_replies(fake: FakeWaha, messages: List[Dict], timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with fake.lock:
+            done = sum(1 for m in messages if m["chat_id"] in fake.replied_at)
+        print(f"\r⏳ Replies: {done}/{len(messages)}", end="", file=sys.stderr)
+        if done == len(messages):
+            break
+        time.sleep(1.0)
+    print(file=sys.stderr)
+
+
+def _utc_ts(value: Optional[datetime.datetime]) -> Optional[float]:
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp() if value else None
+
+
+def load_job_timings(database_url: str, message_ids: List[str]) -> Dict[str, Dict]:
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT message_id, status, priority, created_at, started_at, finished_at "
+                "FROM transcription_jobs WHERE message_id = ANY(:ids)"
+            ),
+            {"ids": message_ids},
+        ).mappings().all()
+    return {
+        row["message_id"]: {
+            "status": row["status"],
+            "priority": row["priority"],
+            "created_at": _utc_ts(row["created_at"]),
+            "started_at": _utc_ts(row["started_at"]),
+            "finished_at": _utc_ts(row["finished_at"]),
+        }
+        for row in rows
+    }
+
+
+def summarize(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(max(values), 3),
+        "mean": round(float(np.mean(values)), 3),
+    }
+
+
+def build_report(args, fake: FakeWaha, messages: List[Dict], jobs: Dict[str, Dict]) -> Dict:
+    stages: Dict[str, List[float]] = {name: [] for name in (
+        "ack", "until_fetch", "fetch_to_reply", "end_to_end", "queue_wait", "processing", "reply_delivery"
+    )}
+    per_session: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+
+    for m in messages:
+        statuses[str(m.get("status"))] = statuses.get(str(m.get("status")), 0) + 1
+        fetched = fake.fetched_at.get(m["message_id"])
+        replied = fake.replied_at.get(m["chat_id"])
+        stages["ack"].append(m["acked_at"] - m["sent_at"])
+        if fetched:
+            stages["until_fetch"].append(fetched - m["sent_at"])
+        if fetched and replied:
+            stages["fetch_to_reply"].append(replied - fetched)
+        if replied:
+            stages["end_to_end"].append(replied - m["sent_at"])
+            per_session.setdefault(m["session"], []).append(replied - m["sent_at"])
+
+        job = jobs.get(m["message_id"])
+        if job and job["created_at"] and job["started_at"]:
+            stages["queue_wait"].append(job["started_at"] - job["created_at"])
+        if job and job["started_at"] and job["finished_at"]:
+            stages["processing"].append(job["finished_at"] - job["started_at"])
+        if job and job["finished_at"] and replied:
+            stages["reply_delivery"].append(replied - job["finished_at"])
+
+    replied_count = len(stages["end_to_end"])
+    span = (max(fake.replied_at.values()) - messages[0]["sent_at"]) if fake.replied_at else 0.0
+    return {
+        "config": {
+            "url": args.url,
+            "rate_per_second": args.rate,
+            "messages": args.messages,
+            "clinics": args.clinics,
+            "audio_lengths": args.lengths,
+            "aggregation_window_seconds": args.aggregation_window,
+        },
+        "webhook_statuses": statuses,
+        "replied": replied_count,
+        "missing_replies": len(messages) - replied_count,
+        "throughput_per_minute": round(replied_count / span * 60, 2) if span else 0.0,
+        "stages": {name: summarize(values) for name, values in stages.items() if values},
+        "end_to_end_by_clinic": {session: summarize(values) for session, values in sorted(per_session.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WhatsApp webhook load simulator")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/webhook/whatsapp")
+    parser.add_argument("--rate", type=float, default=1.0, help="Webhook events per second")
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--clinics", type=int, default=2, help="Distinct WAHA sessions (tenants) to rotate over")
+    parser.add_argument("--lengths", nargs="+", type=float, default=[15, 60], help="Voice note lengths in seconds (cycled)")
+    parser.add_argument("--aggregation-window", type=float, default=0.0, help="Backend AGGREGATION_WINDOW_SECONDS, recorded in the report")
+    parser.add_argument("--waha-host", default="127.0.0.1")
+    parser.add_argument("--waha-port", type=int, default=3900)
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for replies after the last event")
+    parser.add_argument("--database-url", default=None, help="Adds queue/processing stages from transcription_jobs")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    fake = FakeWaha(args.waha_host, args.waha_port)
+    fake.start()
+    print(f"🎭 Stand-in WAHA listening on {fake.base_url} (start the backend with WAHA_BASE_URL={fake.base_url})", file=sys.stderr)
+
+    run_id = uuid.uuid4().hex[:8]
+    try:
+        messages = asyncio.run(send_events(args, fake, run_id))
+        print(f"📨 Sent {len(messages)} events", file=sys.stderr)
+        wait_for_replies(fake, messages, args.timeout)
+    finally:
+        fake.stop()
+
+    jobs = load_job_timings(args.database_url, [m["message_id"] for m in messages]) if args.database_url else {}
+    output = json.dumps(build_report(args, fake, messages, jobs), indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
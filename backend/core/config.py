@@ -17,7 +17,95 @@ class Settings:
     
     # External Services
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
-    
+
+    # Transcription (faster-whisper)
+    WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "medium")
+    WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE")  # None = auto (int8 on CPU)
+    WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = CTranslate2 default
+    WHISPER_DEFAULT_PROFILE = os.getenv("WHISPER_DEFAULT_PROFILE", "balanced")  # fast | balanced | accurate
+    WHISPER_WARMUP_PROFILES = os.getenv("WHISPER_WARMUP_PROFILES", "balanced")  # Comma-separated; loaded at startup, empty = none
+    WHISPER_POOL_SIZE = int(os.getenv("WHISPER_POOL_SIZE", "2"))  # Concurrent transcriptions per resident model
+    WHISPER_PARALLEL_MIN_SECONDS = float(os.getenv("WHISPER_PARALLEL_MIN_SECONDS", "180"))  # Shorter audio is not chunked
+    WHISPER_CHUNK_SECONDS = float(os.getenv("WHISPER_CHUNK_SECONDS", "60"))
+    WHISPER_CHUNK_OVERLAP_SECONDS = float(os.getenv("WHISPER_CHUNK_OVERLAP_SECONDS", "1.0"))
+    WHISPER_WORD_TIMESTAMPS = os.getenv("WHISPER_WORD_TIMESTAMPS", "true").lower() == "true"  # Stored with WhatsApp consultations
+    TRANSCRIPT_MAX_NO_SPEECH_PROB = float(os.getenv("TRANSCRIPT_MAX_NO_SPEECH_PROB", "0.6"))
+    TRANSCRIPT_MIN_AVG_LOGPROB = float(os.getenv("TRANSCRIPT_MIN_AVG_LOGPROB", "-1.0"))
+    DIARIZATION_ENABLED = os.getenv("DIARIZATION_ENABLED", "false").lower() == "true"  # Send only the clinician's speech to the agent
+    DIARIZATION_MIN_SILHOUETTE = float(os.getenv("DIARIZATION_MIN_SILHOUETTE", "0.15"))  # Below this: single speaker
+    TRANSCRIPTION_CACHE_ENABLED = os.getenv("TRANSCRIPTION_CACHE_ENABLED", "true").lower() == "true"
+    # Holds clinical transcripts (patient health data): keep it on a dedicated volume, never in the source tree
+    TRANSCRIPTION_CACHE_PATH = os.getenv("TRANSCRIPTION_CACHE_PATH", "/var/cache/vita-ai/transcriptions.sqlite3")
+    TRANSCRIPTION_CACHE_MAX_MB = int(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "256"))
+    TRANSCRIPTION_CACHE_TTL_HOURS = float(os.getenv("TRANSCRIPTION_CACHE_TTL_HOURS", "24"))  # Entries deleted this long after creation; 0 = size limit only
+
+    # Memory governor (services/memory_governor.py)
+    MODEL_IDLE_TTL_SECONDS = float(os.getenv("MODEL_IDLE_TTL_SECONDS", "1800"))  # 0 = never unload idle models
+    MEMORY_HIGH_WATERMARK_MB = float(os.getenv("MEMORY_HIGH_WATERMARK_MB", "0"))  # 0 = no RSS limit
+    MEMORY_CHECK_INTERVAL_SECONDS = float(os.getenv("MEMORY_CHECK_INTERVAL_SECONDS", "30"))
+
+    # Transcription job queue (workers/transcription_worker.py)
+    TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "1"))  # Worker processes; each holds its own Whisper models
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+    JOB_LOCK_TIMEOUT_SECONDS = float(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "1800"))  # No heartbeat for this long: worker presumed dead
+    JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "60"))  # Lock refresh interval while a job runs
+
+    # Priority lanes and fair sharing (services/job_scheduling.py)
+    PRIORITY_SHORT_AUDIO_SECONDS = float(os.getenv("PRIORITY_SHORT_AUDIO_SECONDS", "90"))  # Voice notes up to this are interactive
+    PRIORITY_LONG_AUDIO_SECONDS = float(os.getenv("PRIORITY_LONG_AUDIO_SECONDS", "600"))  # Recordings above this go to the bulk lane
+    FAIR_SHARE_WINDOW_SECONDS = float(os.getenv("FAIR_SHARE_WINDOW_SECONDS", "3600"))  # How far back "recently served" looks
+    TENANT_MAX_CONCURRENT_JOBS = int(os.getenv("TENANT_MAX_CONCURRENT_JOBS", "0"))  # 0 = no per-tenant cap
+    TENANT_LOOKUP_TTL_SECONDS = float(os.getenv("TENANT_LOOKUP_TTL_SECONDS", "300"))
+
+    # Voice-note aggregation: consecutive notes from one chat become one consultation
+    AGGREGATION_WINDOW_SECONDS = float(os.getenv("AGGREGATION_WINDOW_SECONDS", "15"))  # Quiet period before processing; 0 = off
+    AGGREGATION_MAX_WAIT_SECONDS = float(os.getenv("AGGREGATION_MAX_WAIT_SECONDS", "120"))  # Cap on the debounce from the first note
+    AGGREGATION_MAX_NOTES = int(os.getenv("AGGREGATION_MAX_NOTES", "10"))
+
+    # Webhook idempotency: WAHA message ids already queued
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))  # In-process front cache entries
+    IDEMPOTENCY_CACHE_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_CACHE_TTL_SECONDS", "3600"))
+    IDEMPOTENCY_RETENTION_DAYS = int(os.getenv("IDEMPOTENCY_RETENTION_DAYS", "7"))  # processed_messages rows kept this long
+    JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "30"))  # done/failed transcription_jobs kept this long
+
+    # Outbound HTTP (core/http.py): one pooled client per process
+    HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))  # Read/write/pool timeout for API calls
+    MEDIA_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("MEDIA_DOWNLOAD_TIMEOUT_SECONDS", "60"))
+    MEDIA_MAX_DOWNLOAD_MB = float(os.getenv("MEDIA_MAX_DOWNLOAD_MB", "64"))  # Larger voice notes are rejected mid-stream
+    MEDIA_SPOOL_MEMORY_MB = float(os.getenv("MEDIA_SPOOL_MEMORY_MB", "8"))  # Downloads above this spill to a temp file
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    WAHA_MAX_CONNECTIONS = int(os.getenv("WAHA_MAX_CONNECTIONS", "20"))  # Separate pool so media fetches can't starve WAHA
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"  # Used only if the 'h2' package is installed
+
+    # Outbound WhatsApp dispatcher (services/outbound.py)
+    OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "1.0"))  # Global send rate across all chats and processes
+    OUTBOUND_MIN_DELAY_SECONDS = float(os.getenv("OUTBOUND_MIN_DELAY_SECONDS", "1.0"))  # Human-like delay window
+    OUTBOUND_MAX_DELAY_SECONDS = float(os.getenv("OUTBOUND_MAX_DELAY_SECONDS", "3.0"))
+    OUTBOUND_MAX_ATTEMPTS = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "4"))
+    OUTBOUND_RETRY_BASE_SECONDS = float(os.getenv("OUTBOUND_RETRY_BASE_SECONDS", "2"))
+    OUTBOUND_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOUND_POLL_INTERVAL_SECONDS", "0.5"))  # Outbox polling when idle
+    OUTBOUND_SEND_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_SEND_TIMEOUT_SECONDS", "120"))  # 'sending' longer than this: resent
+
+    # Patient matching (services/patient_matching.py)
+    PATIENT_MATCH_THRESHOLD = float(os.getenv("PATIENT_MATCH_THRESHOLD", "0.8"))  # Below this a new patient is created
+    PATIENT_MATCH_CANDIDATES = int(os.getenv("PATIENT_MATCH_CANDIDATES", "10"))
+    PATIENT_MATCH_PHONE_BOOST = float(os.getenv("PATIENT_MATCH_PHONE_BOOST", "0.15"))
+    PATIENT_MATCH_AMBIGUITY_MARGIN = float(os.getenv("PATIENT_MATCH_AMBIGUITY_MARGIN", "0.05"))  # Runner-up this close: no match
+
+    # In-process patient lookup cache (services/patient_cache.py)
+    PATIENT_CACHE_MAX_ENTRIES = int(os.getenv("PATIENT_CACHE_MAX_ENTRIES", "50000"))  # 0 = disabled
+    PATIENT_CACHE_TTL_SECONDS = float(os.getenv("PATIENT_CACHE_TTL_SECONDS", "600"))  # Bound on staleness if a notification is missed
+
+    # Clinical agent (agent/graph.py)
+    AGENT_PROMPT_VERSION = os.getenv("AGENT_PROMPT_VERSION", "1")  # Key in agent/prompts.py CLINICAL_AGENT_PROMPTS
+    OLLAMA_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", "300"))
+    OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10"))
+
     # Costs
     USD_BRL_RATE = float(os.getenv("USD_BRL_RATE", "5.5"))
 
@@ -1,4 +1,19 @@
+import uuid
 from contextvars import ContextVar
+from typing import List, Optional
 
 # Context variable to store the full transcription text during the request lifecycle
 transcription_context: ContextVar[str] = ContextVar("transcription_context", default="")
+
+# Tenant the current consultation belongs to (None = legacy, untenanted data)
+tenant_context: ContextVar[Optional[uuid.UUID]] = ContextVar("tenant_context", default=None)
+
+# WhatsApp chat the consultation came from (patient phone hint for matching)
+chat_context: ContextVar[Optional[str]] = ContextVar("chat_context", default=None)
+
+# Columnar transcript segments of the consultation being saved (see services/transcript_format.py)
+transcript_segments_context: ContextVar[Optional[dict]] = ContextVar("transcript_segments_context", default=None)
+
+# Ids of the medical records saved by tools during the current agent run. Tools
+# append to the list (tools run in a copied context, so set() would not be seen).
+saved_records_context: ContextVar[Optional[List[int]]] = ContextVar("saved_records_context", default=None)
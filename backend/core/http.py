@@ -0,0 +1,85 @@
+import os
+from typing import Optional
+
+import httpx
+
+from core.config import settings
+
+WAHA_BASE_URL = os.getenv("WAHA_BASE_URL", "http://waha:3000")
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401  (optional: httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+
+def _timeout(read: float = None) -> httpx.Timeout:
+    return httpx.Timeout(read or settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def media_download_timeout() -> httpx.Timeout:
+    return _timeout(settings.MEDIA_DOWNLOAD_TIMEOUT_SECONDS)
+
+
+def _host_pattern(url: str) -> str:
+    parsed = httpx.URL(url)
+    port = f":{parsed.port}" if parsed.port else ""
+    return f"{parsed.scheme}://{parsed.host}{port}"
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Keep-alive client shared by every outbound call in the process. WAHA gets its own
+    connection pool (WAHA_MAX_CONNECTIONS); all other hosts share the default pool.
+    """
+    http2 = _http2_available()
+    waha_transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.WAHA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WAHA_MAX_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=_timeout(),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        mounts={_host_pattern(WAHA_BASE_URL): waha_transport},
+    )
+
+
+async def start_http_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+        print(f"🌐 HTTP client pool ready (http2={_http2_available()})")
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    The process-wide client; also a FastAPI dependency. Created lazily so the worker
+    and scripts get the same pooling without a lifespan hook. Do not close it.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
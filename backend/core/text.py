@@ -0,0 +1,59 @@
+import re
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """Remove accents, collapse whitespace and lowercase text."""
+    if not text:
+        return ""
+    stripped = ''.join(c for c in unicodedata.normalize('NFD', text)
+                       if unicodedata.category(c) != 'Mn')
+    return " ".join(stripped.lower().split())
+
+
+# Brazilian-Portuguese phonetic rewrites, applied in order (inspired by BuscaBR)
+_PHONETIC_RULES = [
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"th"), "t"),
+    (re.compile(r"lh"), "l"),
+    (re.compile(r"nh"), "n"),
+    (re.compile(r"[cs]h"), "x"),
+    (re.compile(r"sc(?=[ei])"), "s"),
+    (re.compile(r"qu(?=[ei])"), "k"),
+    (re.compile(r"gu(?=[ei])"), "g"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"g(?=[eiy])"), "j"),
+    (re.compile(r"[cq]"), "k"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"m$"), "n"),
+    (re.compile(r"ao$"), "an"),
+    (re.compile(r"l$"), "u"),
+]
+
+
+def _phonetic_token(token: str) -> str:
+    for pattern, replacement in _PHONETIC_RULES:
+        token = pattern.sub(replacement, token)
+    if not token:
+        return ""
+    # Keep the first letter and a final vowel (gender: Antonio/Antonia), drop the other
+    # vowels, collapse repeats ("antonio" -> "antno")
+    last = token[-1] if len(token) > 1 and token[-1] in "aeiou" else ""
+    key = token[0] + re.sub(r"[aeiou]", "", token[1:]) + last
+    return re.sub(r"(.)\1+", r"\1", key)
+
+
+def phonetic_key(text: str) -> str:
+    """Per-word phonetic key of a name, so "Antônio Tiago" and "Anthonio Thiago" share one key."""
+    # ç is an "s" sound; unaccenting alone would turn it into a hard "c"
+    words = re.findall(r"[a-z]+", normalize_text((text or "").replace("ç", "s").replace("Ç", "S")))
+    return " ".join(key for key in (_phonetic_token(w) for w in words) if key)
+
+
+def phone_key(phone: str) -> str:
+    """Last 8 digits of a phone number or WhatsApp chat id: stable across country/area code and the mobile 9th digit."""
+    digits = "".join(filter(str.isdigit, (phone or "").split("@")[0]))
+    return digits[-8:] if len(digits) >= 8 else ""
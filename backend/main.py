@@ -1,12 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from api.endpoints import router as api_router
 from api.webhook import router as webhook_router
 from api import integrations
-# Import graph to trigger model preloading
-# import agent.graph
+from services.warmup import current_readiness, warm_up_models
+from services.memory_governor import memory_governor
+from core.http import start_http_client, close_http_client
+from services.outbound import get_outbound_dispatcher
 
-app = FastAPI(title="Vita.AI API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm Whisper models in the background: the server answers liveness
+    # probes right away, and /healthz/ready turns green once models are resident.
+    warmup_task = asyncio.create_task(asyncio.to_thread(warm_up_models))
+    memory_governor.start()
+    await start_http_client()
+    get_outbound_dispatcher().start()
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
+    await get_outbound_dispatcher().drain()
+    await close_http_client()
+
+app = FastAPI(title="Vita.AI API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -32,3 +51,13 @@ app.include_router(finance_router, prefix="/api/v1/finance")
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Vita.AI Transcript API"}
+
+@app.get("/healthz/live")
+def liveness():
+    return {"status": "alive"}
+
+@app.get("/healthz/ready")
+def readiness_probe():
+    """200 once the configured Whisper profiles have been loaded and warmed up, 503 before that."""
+    state = current_readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
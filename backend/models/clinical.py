@@ -1,7 +1,8 @@
 import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, event, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
+from core.text import normalize_text, phone_key, phonetic_key
 from database import Base
 
 class Patient(Base):
@@ -10,14 +11,38 @@ class Patient(Base):
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), index=True, nullable=True) # Temporarily nullable for migration
     name = Column(String, index=True)
-    cpf = Column(String, unique=True, index=True, nullable=True)
+    cpf = Column(String, index=True, nullable=True)  # Unique per tenant (uq_patients_tenant_cpf)
     phone = Column(String, index=True, nullable=True)
     birth_date = Column(DateTime, nullable=True)
     aliases = Column(JSONB, default=[])
+    # Accent/case-insensitive search keys, maintained on write (see _normalize_patient)
+    name_normalized = Column(String, nullable=True)
+    aliases_normalized = Column(JSONB, default=[])
+    name_phonetic = Column(String, nullable=True)  # core.text.phonetic_key, one key per word
+    phone_key = Column(String, nullable=True)  # Last 8 digits of phone
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     appointments = relationship("Appointment", back_populates="patient")
 
+    __table_args__ = (
+        # Partial: patients without CPF (most dictations) never collide
+        Index("uq_patients_tenant_cpf", "tenant_id", "cpf", unique=True, postgresql_nulls_not_distinct=True, postgresql_where=text("cpf IS NOT NULL")),
+        Index("ix_patients_tenant_name_normalized", "tenant_id", "name_normalized"),
+        Index("ix_patients_aliases_normalized", "aliases_normalized", postgresql_using="gin", postgresql_ops={"aliases_normalized": "jsonb_path_ops"}),
+        # Candidate retrieval for services/patient_matching.py (pg_trgm)
+        Index("ix_patients_name_trgm", "name_normalized", postgresql_using="gin", postgresql_ops={"name_normalized": "gin_trgm_ops"}),
+        Index("ix_patients_name_phonetic", "name_phonetic", postgresql_ops={"name_phonetic": "text_pattern_ops"}),
+        Index("ix_patients_tenant_phone_key", "tenant_id", "phone_key"),
+    )
+
+@event.listens_for(Patient, "before_insert")
+@event.listens_for(Patient, "before_update")
+def _normalize_patient(mapper, connection, patient):
+    patient.name_normalized = normalize_text(patient.name) or None
+    patient.aliases_normalized = sorted({normalize_text(a) for a in (patient.aliases or []) if normalize_text(a)})
+    patient.name_phonetic = phonetic_key(patient.name) or None
+    patient.phone_key = phone_key(patient.phone) or None
+
 class Appointment(Base):
     __tablename__ = "appointments"
     
@@ -40,6 +65,7 @@ class MedicalRecord(Base):
     record_type = Column(String)
     structured_content = Column(JSONB)
     full_transcription = Column(Text)
+    transcript_segments = Column(JSONB, nullable=True)  # Columnar timestamps/confidence (services/transcript_format.py)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     appointment = relationship("Appointment", back_populates="medical_records")
@@ -0,0 +1,76 @@
+import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from database import Base
+
+class TranscriptionJob(Base):
+    """
+    Persistent queue entry for a WhatsApp voice note waiting to be transcribed
+    and processed by the agent. Claimed by workers with FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = "transcription_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(UUID(as_uuid=True), ForeignKey("tenants.id"), index=True, nullable=True)
+    message_id = Column(String, index=True, nullable=False)
+    chat_id = Column(String, nullable=True)
+    media_url = Column(String, nullable=True)
+    status = Column(String, default="pending", nullable=False)  # pending, processing, done, failed
+    priority = Column(Integer, default=0, nullable=False)  # Lane, higher runs first (services/job_scheduling.py)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    batch_job_id = Column(Integer, ForeignKey("transcription_jobs.id"), index=True, nullable=True)  # Set while processed as part of another job's batch
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)  # Retry backoff
+    locked_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)  # Last claim; drives per-tenant fair sharing
+    finished_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_transcription_jobs_claim", "status", "priority", "available_at"),
+        Index("ix_transcription_jobs_tenant_started", "tenant_id", "started_at"),
+        Index("ix_transcription_jobs_chat_pending", "chat_id", "status"),
+        # claim_next_batch's per-tenant subqueries: recent starts (range) and jobs in flight
+        Index("ix_transcription_jobs_started_at", "started_at"),
+        Index("ix_transcription_jobs_processing_tenant", "tenant_id", postgresql_where=text("status = 'processing'")),
+        Index("ix_transcription_jobs_finished_at", "finished_at"),  # purge_finished_jobs
+    )
+
+class ProcessedMessage(Base):
+    """
+    Idempotency key for inbound WAHA messages. The primary key rejects redeliveries;
+    inserted in the same transaction as the TranscriptionJob it produced.
+    """
+    __tablename__ = "processed_messages"
+
+    message_id = Column(String, primary_key=True)
+    job_id = Column(Integer, ForeignKey("transcription_jobs.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class OutboundMessage(Base):
+    """
+    Outbox row for a WhatsApp reply. Committed by the producer, delivered by the
+    outbound dispatcher in any API/worker process (services/outbound.py), so replies
+    survive restarts and the send rate is shared by every process.
+    """
+    __tablename__ = "outbound_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(String, nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending, sending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)  # Human-like delay / retry backoff
+    claimed_at = Column(DateTime, nullable=True)  # Last claim; spaces sends by the global rate
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_outbound_messages_claim", "status", "available_at"),
+        Index("ix_outbound_messages_chat_status", "chat_id", "status"),
+        Index("ix_outbound_messages_claimed_at", "claimed_at"),
+        Index("ix_outbound_messages_created_at", "created_at"),
+    )
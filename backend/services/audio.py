@@ -0,0 +1,24 @@
+import io
+
+import numpy as np
+from faster_whisper import decode_audio
+
+# Whisper's native input format
+SAMPLING_RATE = 16000
+
+
+def decode_audio_bytes(data: bytes, sampling_rate: int = SAMPLING_RATE) -> np.ndarray:
+    """
+    Decode encoded audio (OGG/Opus, MP3, WAV, M4A...) straight from memory into a
+    mono float32 PCM array resampled to `sampling_rate`. No temp file is written.
+    """
+    return decode_audio(io.BytesIO(data), sampling_rate=sampling_rate)
+
+
+def to_pcm(audio, sampling_rate: int = SAMPLING_RATE) -> np.ndarray:
+    """Normalize a file path, encoded bytes or an existing PCM array to a PCM array."""
+    if isinstance(audio, np.ndarray):
+        return audio
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return decode_audio_bytes(bytes(audio), sampling_rate=sampling_rate)
+    return decode_audio(audio, sampling_rate=sampling_rate)
@@ -0,0 +1,108 @@
+from typing import Dict, List, Tuple
+
+# A chunk is (core_start, core_end, start, end) in samples.
+# [core_start, core_end) partitions the audio without gaps or overlap;
+# [start, end) is what actually gets transcribed (core plus overlap on both sides).
+Chunk = Tuple[int, int, int, int]
+
+
+def plan_chunks(
+    speech_timestamps: List[Dict[str, int]],
+    total_samples: int,
+    sampling_rate: int = 16000,
+    max_chunk_s: float = 60.0,
+    overlap_s: float = 1.0,
+) -> List[Chunk]:
+    """
+    Group VAD speech regions into chunks of at most ~max_chunk_s, cutting in the
+    middle of the silence between regions. A single region longer than the limit
+    is hard-split; the overlap keeps words at those cuts from being lost.
+    """
+    max_len = int(max_chunk_s * sampling_rate)
+    overlap = int(overlap_s * sampling_rate)
+
+    # Cut points in samples, always starting at 0 and ending at total_samples
+    cuts = [0]
+    chunk_start = 0
+    for i, region in enumerate(speech_timestamps):
+        region_start, region_end = region["start"], region["end"]
+
+        # Close the current chunk in the silence before this region if it would overflow
+        if region_end - chunk_start > max_len and region_start > chunk_start:
+            prev_end = speech_timestamps[i - 1]["end"] if i > 0 else chunk_start
+            cut = max(chunk_start + 1, (prev_end + region_start) // 2)
+            cuts.append(cut)
+            chunk_start = cut
+
+        # Region itself is too long: hard-split it
+        while region_end - chunk_start > max_len:
+            chunk_start += max_len
+            cuts.append(chunk_start)
+
+    if cuts[-1] < total_samples:
+        cuts.append(total_samples)
+
+    chunks = []
+    for core_start, core_end in zip(cuts, cuts[1:]):
+        if core_end <= core_start:
+            continue
+        chunks.append((
+            core_start,
+            core_end,
+            max(0, core_start - overlap),
+            min(total_samples, core_end + overlap),
+        ))
+    return chunks
+
+
+def stitch_segments(
+    chunk_results: List[Tuple[Chunk, List[Dict]]],
+    sampling_rate: int = 16000,
+) -> List[Dict]:
+    """
+    Merge per-chunk segments (timestamps relative to the chunk) into one timeline.
+    A segment belongs to the chunk whose core contains its midpoint, which drops
+    the copies transcribed twice inside overlaps; identical back-to-back text at a
+    boundary is dropped as well.
+    """
+    stitched: List[Dict] = []
+    for chunk, segments in sorted(chunk_results, key=lambda item: item[0][0]):
+        core_start, core_end, start, _ = chunk
+        offset = start / sampling_rate
+        core_start_s = core_start / sampling_rate
+        core_end_s = core_end / sampling_rate
+
+        for segment in segments:
+            seg = {**segment, "start": segment["start"] + offset, "end": segment["end"] + offset}
+            if segment.get("words"):
+                seg["words"] = [
+                    {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                    for word in segment["words"]
+                ]
+            midpoint = (seg["start"] + seg["end"]) / 2
+            if not (core_start_s <= midpoint < core_end_s):
+                continue
+            if stitched and stitched[-1]["text"].strip() == seg["text"].strip() and seg["start"] < stitched[-1]["end"]:
+                continue
+            stitched.append(seg)
+    return stitched
+
+
+def concat_segments(part_results: List[Tuple[float, List[Dict]]]) -> List[Dict]:
+    """
+    Join the segments of consecutive recordings ((duration_s, segments) in order)
+    into one timeline, shifting each recording by the length of those before it.
+    """
+    joined: List[Dict] = []
+    offset = 0.0
+    for duration, segments in part_results:
+        for segment in segments:
+            seg = {**segment, "start": segment["start"] + offset, "end": segment["end"] + offset}
+            if segment.get("words"):
+                seg["words"] = [
+                    {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                    for word in segment["words"]
+                ]
+            joined.append(seg)
+        offset += duration
+    return joined
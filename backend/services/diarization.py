@@ -0,0 +1,106 @@
+from typing import Dict, List
+
+import numpy as np
+from faster_whisper.feature_extractor import FeatureExtractor
+
+from core.config import settings
+from services.audio import SAMPLING_RATE
+
+CLINICIAN = "clinician"
+OTHER = "other"
+
+_feature_extractor = FeatureExtractor(feature_size=80, sampling_rate=SAMPLING_RATE)
+
+
+def _embed(audio: np.ndarray, segments: List[Dict]) -> np.ndarray:
+    """
+    One vector per segment: mean and std of Whisper's log-mel spectrogram over the
+    segment (capped at 30 s). Cheap on CPU and good enough to tell two voices apart.
+    """
+    embeddings = []
+    for segment in segments:
+        start = int(segment["start"] * SAMPLING_RATE)
+        end = min(len(audio), int(segment["end"] * SAMPLING_RATE), start + 30 * SAMPLING_RATE)
+        window = audio[start:end]
+        if len(window) < SAMPLING_RATE // 10:
+            window = np.pad(window, (0, SAMPLING_RATE // 10 - len(window)))
+        mel = _feature_extractor(window, padding=0)
+        embeddings.append(np.concatenate([mel.mean(axis=1), mel.std(axis=1)]))
+    embeddings = np.stack(embeddings)
+    # Standardize across the recording so channel/room characteristics cancel out
+    embeddings = (embeddings - embeddings.mean(axis=0)) / (embeddings.std(axis=0) + 1e-6)
+    return embeddings
+
+
+def _distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Euclidean distances between the rows of `a` and `b` via the Gram matrix
+    (|a|^2 + |b|^2 - 2 a.b): len(a) x len(b) memory, not len(a) x len(b) x dims.
+    """
+    squared = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2.0 * (a @ b.T)
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def _kmeans2(x: np.ndarray, iterations: int = 20) -> np.ndarray:
+    # Deterministic farthest-point init
+    first = 0
+    second = int(np.argmax(np.linalg.norm(x - x[first], axis=1)))
+    centroids = x[[first, second]].copy()
+    labels = None
+    for _ in range(iterations):
+        distances = _distances(x, centroids)
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for k in range(2):
+            if np.any(labels == k):
+                centroids[k] = x[labels == k].mean(axis=0)
+    return labels
+
+
+def _silhouette(x: np.ndarray, labels: np.ndarray) -> float:
+    distances = _distances(x, x)
+    scores = []
+    for i, label in enumerate(labels):
+        same = labels == label
+        same[i] = False
+        other = labels != label
+        if not same.any() or not other.any():
+            scores.append(0.0)
+            continue
+        a = distances[i, same].mean()
+        b = distances[i, other].mean()
+        scores.append((b - a) / max(a, b))
+    return float(np.mean(scores))
+
+
+def diarize(audio: np.ndarray, segments: List[Dict]) -> List[Dict]:
+    """
+    Label each Whisper segment with a "speaker": CLINICIAN or OTHER.
+
+    Segments are clustered into two voices; if the clusters are not clearly
+    separated (silhouette below DIARIZATION_MIN_SILHOUETTE) the recording is
+    treated as a single-speaker dictation. The voice with the most speaking time
+    is taken to be the clinician. Labels are per segment, so a turn change inside
+    one Whisper segment is not split.
+    """
+    if not segments:
+        return segments
+    if len(segments) < 4:
+        return [{**segment, "speaker": CLINICIAN} for segment in segments]
+
+    embeddings = _embed(audio, segments)
+    labels = _kmeans2(embeddings)
+    if len(set(labels)) < 2 or _silhouette(embeddings, labels) < settings.DIARIZATION_MIN_SILHOUETTE:
+        return [{**segment, "speaker": CLINICIAN} for segment in segments]
+
+    talk_time = [0.0, 0.0]
+    for segment, label in zip(segments, labels):
+        talk_time[label] += segment["end"] - segment["start"]
+    clinician_label = int(np.argmax(talk_time))
+
+    return [
+        {**segment, "speaker": CLINICIAN if label == clinician_label else OTHER}
+        for segment, label in zip(segments, labels)
+    ]
@@ -0,0 +1,41 @@
+import threading
+import time
+from collections import OrderedDict
+
+from core.config import settings
+
+
+class SeenMessages:
+    """
+    Bounded in-process TTL set of message ids already accepted by this process.
+
+    Absorbs WAHA's rapid redeliveries without a database round trip. It is only a
+    front cache: the authoritative check is the processed_messages primary key
+    (services/job_queue.py), which also covers restarts and multiple API replicas.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, message_id: str) -> bool:
+        with self._lock:
+            expires = self._entries.get(message_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._entries[message_id]
+                return False
+            return True
+
+    def add(self, message_id: str):
+        with self._lock:
+            self._entries[message_id] = time.monotonic() + self.ttl
+            self._entries.move_to_end(message_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+seen_messages = SeenMessages(max_size=settings.IDEMPOTENCY_CACHE_SIZE, ttl=settings.IDEMPOTENCY_CACHE_TTL_SECONDS)
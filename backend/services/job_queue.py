@@ -0,0 +1,282 @@
+import datetime
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models import ProcessedMessage, TranscriptionJob
+from services.job_scheduling import LANE_BULK
+
+
+def enqueue_transcription_job(
+    db: Session,
+    message_id: str,
+    media_url: Optional[str] = None,
+    chat_id: Optional[str] = None,
+    priority: int = 0,
+    tenant_id: Optional[uuid.UUID] = None,
+) -> Optional[TranscriptionJob]:
+    """
+    Queue a job for a WAHA message, at most once per message id.
+    Returns None when the message was already queued (e.g. a WAHA redelivery).
+    The idempotency key and the job are committed in the same transaction.
+    With aggregation on, every waiting note of the chat is debounced so a burst of
+    notes is claimed and processed together (see claim_next_batch).
+    """
+    now = datetime.datetime.utcnow()
+    claimed = db.execute(
+        pg_insert(ProcessedMessage)
+        .values(message_id=message_id, created_at=now)
+        .on_conflict_do_nothing(index_elements=[ProcessedMessage.message_id])
+        .returning(ProcessedMessage.message_id)
+    ).scalar()
+    if claimed is None:
+        db.rollback()
+        return None
+
+    job = TranscriptionJob(
+        message_id=message_id,
+        tenant_id=tenant_id,
+        media_url=media_url,
+        chat_id=chat_id,
+        priority=priority,
+        status="pending",
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        available_at=now,
+        created_at=now,
+    )
+    db.add(job)
+    db.flush()
+    if chat_id and settings.AGGREGATION_WINDOW_SECONDS > 0:
+        _debounce_chat(db, chat_id, now)
+    db.execute(
+        update(ProcessedMessage)
+        .where(ProcessedMessage.message_id == message_id)
+        .values(job_id=job.id)
+    )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _debounce_chat(db: Session, chat_id: str, now: datetime.datetime):
+    """
+    Hold the chat's unclaimed notes until AGGREGATION_WINDOW_SECONDS after the latest
+    one, but never longer than AGGREGATION_MAX_WAIT_SECONDS after the first.
+    """
+    waiting = (
+        TranscriptionJob.chat_id == chat_id,
+        TranscriptionJob.status == "pending",
+        TranscriptionJob.attempts == 0,
+    )
+    first = db.query(func.min(TranscriptionJob.created_at)).filter(*waiting).scalar() or now
+    ready_at = min(
+        now + datetime.timedelta(seconds=settings.AGGREGATION_WINDOW_SECONDS),
+        first + datetime.timedelta(seconds=settings.AGGREGATION_MAX_WAIT_SECONDS),
+    )
+    db.execute(update(TranscriptionJob).where(*waiting).values(available_at=ready_at))
+
+
+def claim_next_batch(db: Session) -> List[TranscriptionJob]:
+    """
+    Atomically take the next runnable job.
+
+    Highest priority lane first. Within a lane, tenants take turns: the tenant with
+    the fewest jobs currently processing, then the one served longest ago (within
+    FAIR_SHARE_WINDOW_SECONDS), wins; oldest job first inside a tenant. So one clinic's
+    backlog cannot hold up another clinic's voice notes in the same lane.
+    SKIP LOCKED lets several workers poll the table without blocking each other.
+
+    The other runnable notes from the same chat are claimed along with it (up to
+    AGGREGATION_MAX_NOTES) and point at it through batch_job_id. Returns the batch
+    in arrival order, or [] when nothing is runnable; the batch is identified by
+    the first-claimed job's id, which complete_job/fail_job take.
+    """
+    now = datetime.datetime.utcnow()
+    window_start = now - datetime.timedelta(seconds=settings.FAIR_SHARE_WINDOW_SECONDS)
+
+    running = (
+        db.query(TranscriptionJob.tenant_id, func.count().label("n"))
+        .filter(TranscriptionJob.status == "processing")
+        .group_by(TranscriptionJob.tenant_id)
+        .subquery()
+    )
+    recent = (
+        db.query(TranscriptionJob.tenant_id, func.max(TranscriptionJob.started_at).label("last_started"))
+        .filter(TranscriptionJob.started_at > window_start)
+        .group_by(TranscriptionJob.tenant_id)
+        .subquery()
+    )
+    in_flight = func.coalesce(running.c.n, 0)
+
+    query = (
+        db.query(TranscriptionJob)
+        .outerjoin(running, running.c.tenant_id.is_not_distinct_from(TranscriptionJob.tenant_id))
+        .outerjoin(recent, recent.c.tenant_id.is_not_distinct_from(TranscriptionJob.tenant_id))
+        .filter(TranscriptionJob.status == "pending", TranscriptionJob.available_at <= now)
+    )
+    if settings.TENANT_MAX_CONCURRENT_JOBS > 0:
+        query = query.filter(in_flight < settings.TENANT_MAX_CONCURRENT_JOBS)
+
+    job = (
+        query.order_by(
+            TranscriptionJob.priority.desc(),
+            in_flight.asc(),
+            recent.c.last_started.asc().nulls_first(),
+            TranscriptionJob.created_at.asc(),
+        )
+        .with_for_update(skip_locked=True, of=TranscriptionJob)
+        .first()
+    )
+    if job is None:
+        db.rollback()
+        return []
+
+    batch = [job]
+    if job.chat_id and settings.AGGREGATION_WINDOW_SECONDS > 0 and settings.AGGREGATION_MAX_NOTES > 1:
+        batch += (
+            db.query(TranscriptionJob)
+            .filter(
+                TranscriptionJob.chat_id == job.chat_id,
+                TranscriptionJob.tenant_id.is_not_distinct_from(job.tenant_id),
+                TranscriptionJob.status == "pending",
+                TranscriptionJob.available_at <= now,
+                TranscriptionJob.id != job.id,
+            )
+            .order_by(TranscriptionJob.created_at.asc())
+            .limit(settings.AGGREGATION_MAX_NOTES - 1)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    for member in batch:
+        member.status = "processing"
+        member.attempts += 1
+        member.locked_at = now
+        member.started_at = now
+        member.batch_job_id = job.id if member is not job else None
+    db.commit()
+    for member in batch:
+        db.refresh(member)
+    return sorted(batch, key=lambda member: member.created_at)
+
+
+def _batch_filter(job_id: int):
+    return or_(TranscriptionJob.id == job_id, TranscriptionJob.batch_job_id == job_id)
+
+
+def complete_job(db: Session, job_id: int):
+    db.execute(
+        update(TranscriptionJob)
+        .where(_batch_filter(job_id), TranscriptionJob.status == "processing")
+        .values(status="done", finished_at=datetime.datetime.utcnow(), locked_at=None, last_error=None)
+    )
+    db.commit()
+
+
+def fail_job(db: Session, job_id: int, error: str):
+    """
+    Put the job's batch back with exponential backoff, or mark members failed once
+    their attempts are exhausted. Members are released individually and regrouped
+    on the next claim.
+    """
+    members = (
+        db.query(TranscriptionJob)
+        .filter(_batch_filter(job_id), TranscriptionJob.status == "processing")
+        .all()
+    )
+    for job in members:
+        job.last_error = error[:4000]
+        job.locked_at = None
+        job.batch_job_id = None
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = datetime.datetime.utcnow()
+        else:
+            delay = settings.JOB_RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+            job.status = "pending"
+            # Re-processing never competes with fresh dictations
+            job.priority = min(job.priority, LANE_BULK)
+            job.available_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+    db.commit()
+
+
+def heartbeat_job(db: Session, job_id: int) -> int:
+    """
+    Refresh the batch's lock while it is being processed, so a long job (a long
+    recording, a batch of notes) is not taken for a dead worker's and run twice.
+    """
+    result = db.execute(
+        update(TranscriptionJob)
+        .where(_batch_filter(job_id), TranscriptionJob.status == "processing")
+        .values(locked_at=datetime.datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount
+
+
+def requeue_stale_jobs(db: Session) -> int:
+    """
+    Release jobs left in 'processing' by a worker that died mid-run (its lock was not
+    refreshed for JOB_LOCK_TIMEOUT_SECONDS). A job that has used up its attempts is
+    marked failed instead: one that keeps crashing the worker must not loop forever.
+    """
+    now = datetime.datetime.utcnow()
+    stale = (
+        TranscriptionJob.status == "processing",
+        TranscriptionJob.locked_at < now - datetime.timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS),
+    )
+    error = "Worker stopped responding while processing the job"
+    failed = db.execute(
+        update(TranscriptionJob)
+        .where(*stale, TranscriptionJob.attempts >= TranscriptionJob.max_attempts)
+        .values(status="failed", locked_at=None, batch_job_id=None, finished_at=now, last_error=error)
+    )
+    released = db.execute(
+        update(TranscriptionJob)
+        .where(*stale, TranscriptionJob.attempts < TranscriptionJob.max_attempts)
+        .values(
+            status="pending",
+            locked_at=None,
+            batch_job_id=None,
+            available_at=now,
+            last_error=error,
+            # Re-processing never competes with fresh dictations
+            priority=func.least(TranscriptionJob.priority, LANE_BULK),
+        )
+    )
+    db.commit()
+    if failed.rowcount:
+        print(f"❌ Marked {failed.rowcount} stale jobs failed (attempts exhausted)")
+    return released.rowcount
+
+
+def purge_finished_jobs(db: Session) -> int:
+    """
+    Drop done/failed jobs finished more than JOB_RETENTION_DAYS ago, so the claim
+    query's scans don't grow with the table's whole history.
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=settings.JOB_RETENTION_DAYS)
+    old = (
+        select(TranscriptionJob.id)
+        .where(TranscriptionJob.status.in_(("done", "failed")), TranscriptionJob.finished_at < cutoff)
+        .scalar_subquery()
+    )
+    # Detach what still points at them (idempotency keys, batch members)
+    db.execute(update(ProcessedMessage).where(ProcessedMessage.job_id.in_(old)).values(job_id=None))
+    db.execute(update(TranscriptionJob).where(TranscriptionJob.batch_job_id.in_(old)).values(batch_job_id=None))
+    result = db.execute(delete(TranscriptionJob).where(TranscriptionJob.id.in_(old)))
+    db.commit()
+    return result.rowcount
+
+
+def purge_processed_messages(db: Session) -> int:
+    """Drop idempotency keys older than IDEMPOTENCY_RETENTION_DAYS; WAHA never redelivers that late."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=settings.IDEMPOTENCY_RETENTION_DAYS)
+    result = db.execute(delete(ProcessedMessage).where(ProcessedMessage.created_at < cutoff))
+    db.commit()
+    return result.rowcount
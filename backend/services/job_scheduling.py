@@ -0,0 +1,73 @@
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models import Tenant
+
+# Priority lanes (TranscriptionJob.priority, higher runs first)
+LANE_INTERACTIVE = 20  # Short voice notes: someone is waiting for the reply
+LANE_NORMAL = 10       # Regular dictations, or duration unknown
+LANE_BULK = 0          # Long recordings, forwarded audio files and retries
+
+LANE_NAMES = {LANE_INTERACTIVE: "interactive", LANE_NORMAL: "normal", LANE_BULK: "bulk"}
+
+
+def audio_duration(payload: Dict[str, Any]) -> Optional[float]:
+    """Voice note length in seconds as reported by WAHA, if the engine includes it."""
+    media = payload.get("media") or {}
+    raw = payload.get("_data") or {}
+    for value in (payload.get("duration"), media.get("duration"), raw.get("duration"), raw.get("seconds")):
+        try:
+            if value is not None:
+                return float(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def classify_priority(msg_type: Optional[str], duration: Optional[float]) -> int:
+    """
+    Pick the lane for a new job. Push-to-talk notes are live dictation; "audio" messages
+    are forwarded/attached files, usually recordings of a whole consultation.
+    """
+    if duration is not None and duration > settings.PRIORITY_LONG_AUDIO_SECONDS:
+        return LANE_BULK
+    if msg_type in ("ptt", "voice"):
+        if duration is None or duration <= settings.PRIORITY_SHORT_AUDIO_SECONDS:
+            return LANE_INTERACTIVE
+        return LANE_NORMAL
+    if duration is not None and duration <= settings.PRIORITY_SHORT_AUDIO_SECONDS:
+        return LANE_NORMAL
+    return LANE_BULK
+
+
+_tenant_by_session: Dict[str, Tuple[float, Optional[uuid.UUID]]] = {}
+_tenant_lock = threading.Lock()
+
+
+def resolve_tenant_id(db: Session, session: Optional[str]) -> Optional[uuid.UUID]:
+    """
+    Map a WAHA session name to the tenant that owns it (Tenant.config["waha_session"]).
+    Cached for TENANT_LOOKUP_TTL_SECONDS; unknown sessions share the untenanted lane.
+    """
+    if not session:
+        return None
+    now = time.monotonic()
+    with _tenant_lock:
+        cached = _tenant_by_session.get(session)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    tenant = (
+        db.query(Tenant.id)
+        .filter(Tenant.config["waha_session"].astext == session, Tenant.is_active.is_(True))
+        .first()
+    )
+    tenant_id = tenant.id if tenant is not None else None
+    with _tenant_lock:
+        _tenant_by_session[session] = (now + settings.TENANT_LOOKUP_TTL_SECONDS, tenant_id)
+    return tenant_id
@@ -1,6 +1,8 @@
 import os
+from functools import lru_cache
 from langchain_community.chat_models import ChatOllama
 from langchain_core.messages import HumanMessage, SystemMessage
+from services.memory_governor import memory_governor
 
 class LLMService:
     def __init__(self, model="llama3.1:8b-instruct-q4_K_S"):
@@ -24,3 +26,19 @@ class LLMService:
             return response.content
         except Exception as e:
             return f"Error processing text with LLM: {e}"
+
+
+@lru_cache(maxsize=None)
+def _shared_llm_service() -> LLMService:
+    service = LLMService()
+    # Dropped by the memory governor when idle; rebuilt on next use
+    memory_governor.register("llm:ollama-client", unload=_shared_llm_service.cache_clear)
+    return service
+
+def get_llm_service() -> LLMService:
+    """
+    Shared LLMService (one ChatOllama client per process).
+    Usable directly or as a FastAPI dependency.
+    """
+    memory_governor.touch("llm:ollama-client")
+    return _shared_llm_service()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+from typing import Dict, Optional, Union
+
+import httpx
+
+from core.config import settings
+from core.http import media_download_timeout
+
+PROGRESS_LOG_BYTES = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class MediaTooLargeError(Exception):
+    pass
+
+
+class DownloadedMedia:
+    """
+    Result of a streamed download: small files stay in memory (`data`), larger ones
+    are spooled to a temp file (`path`). Use as a context manager to remove the file.
+    """
+
+    def __init__(self, data: Optional[bytes] = None, path: Optional[str] = None, size: int = 0):
+        self.data = data
+        self.path = path
+        self.size = size
+
+    @property
+    def audio(self) -> Union[bytes, str]:
+        return self.data if self.data is not None else self.path
+
+    def cleanup(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+async def download_media(client: httpx.AsyncClient, url: str, headers: Dict[str, str] = None, max_bytes: int = None) -> DownloadedMedia:
+    """
+    Stream `url` in chunks. Memory is bounded by MEDIA_SPOOL_MEMORY_MB; anything above
+    MEDIA_MAX_DOWNLOAD_MB (checked against Content-Length first, then while reading)
+    raises MediaTooLargeError before the rest of the body is fetched.
+    """
+    max_bytes = max_bytes or int(settings.MEDIA_MAX_DOWNLOAD_MB * 1024 * 1024)
+    spool_bytes = int(settings.MEDIA_SPOOL_MEMORY_MB * 1024 * 1024)
+    started = time.perf_counter()
+
+    async with client.stream("GET", url, headers=headers, timeout=media_download_timeout()) as response:
+        response.raise_for_status()
+        declared = int(response.headers.get("content-length") or 0)
+        if declared > max_bytes:
+            raise MediaTooLargeError(f"Media is {declared} bytes (limit {max_bytes})")
+
+        buffer = bytearray()
+        spool = None
+        received = 0
+        next_log = PROGRESS_LOG_BYTES
+        try:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise MediaTooLargeError(f"Media exceeded {max_bytes} bytes while downloading")
+                if spool is None and received > spool_bytes:
+                    spool = tempfile.NamedTemporaryFile(prefix="vita-media-", delete=False)
+                    spool.write(buffer)
+                    buffer = bytearray()
+                if spool is not None:
+                    spool.write(chunk)
+                else:
+                    buffer.extend(chunk)
+                if received >= next_log:
+                    total = f"/{declared}" if declared else ""
+                    print(f"⬇️ Downloaded {received}{total} bytes")
+                    next_log += PROGRESS_LOG_BYTES
+        except BaseException:
+            if spool is not None:
+                spool.close()
+                os.remove(spool.name)
+            raise
+
+    elapsed = time.perf_counter() - started
+    print(f"Audio downloaded ({received} bytes in {elapsed:.2f}s{', spooled to disk' if spool else ''})")
+    if spool is not None:
+        spool.close()
+        return DownloadedMedia(path=spool.name, size=received)
+    return DownloadedMedia(data=bytes(buffer), size=received)
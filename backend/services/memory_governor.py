@@ -0,0 +1,134 @@
+import ctypes
+import gc
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from core.config import settings
+
+
+class _Resource:
+    def __init__(self, unload: Callable[[], Optional[bool]], busy: Callable[[], bool]):
+        self.unload = unload
+        self.busy = busy
+        self.last_used = time.monotonic()
+
+
+class MemoryGovernor:
+    """
+    Tracks unloadable in-process resources (Whisper models, LLM clients) and frees them
+    when they have been idle longer than `idle_ttl` seconds, or least-recently-used first
+    while process RSS is above `high_watermark_mb`. Owners reload lazily on next use.
+    Resources reporting busy() are never unloaded.
+    """
+
+    def __init__(self, idle_ttl: float, high_watermark_mb: float, check_interval: float):
+        self.idle_ttl = idle_ttl
+        self.high_watermark_mb = high_watermark_mb
+        self.check_interval = check_interval
+        self._resources: Dict[str, _Resource] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, unload: Callable[[], Optional[bool]], busy: Callable[[], bool] = lambda: False):
+        with self._lock:
+            self._resources[name] = _Resource(unload, busy)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._resources.pop(name, None)
+
+    def touch(self, name: str):
+        resource = self._resources.get(name)
+        if resource is not None:
+            resource.last_used = time.monotonic()
+
+    def resident(self) -> List[str]:
+        return list(self._resources.keys())
+
+    @staticmethod
+    def rss_mb() -> float:
+        try:
+            with open("/proc/self/statm") as f:
+                pages = int(f.read().split()[1])
+            return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError):
+            return 0.0
+
+    def _release(self, name: str, reason: str) -> bool:
+        with self._lock:
+            resource = self._resources.get(name)
+            if resource is None or resource.busy():
+                return False
+            self._resources.pop(name)
+        print(f"🧠 Memory governor: unloading {name} ({reason})")
+        if resource.unload() is False:
+            # Became busy between the check and the unload: keep tracking it
+            with self._lock:
+                self._resources.setdefault(name, resource)
+            print(f"🧠 Memory governor: {name} is in use, kept")
+            return False
+        return True
+
+    def sweep(self) -> List[str]:
+        """One governor pass. Returns the names that were unloaded."""
+        unloaded = []
+        now = time.monotonic()
+
+        if self.idle_ttl > 0:
+            for name, resource in list(self._resources.items()):
+                idle = now - resource.last_used
+                if idle > self.idle_ttl and self._release(name, f"idle {idle:.0f}s"):
+                    unloaded.append(name)
+
+        if self.high_watermark_mb > 0:
+            rss = self.rss_mb()
+            while rss > self.high_watermark_mb:
+                candidates = sorted(
+                    (r.last_used, n) for n, r in self._resources.items() if not r.busy()
+                )
+                if not candidates:
+                    break
+                _, name = candidates[0]
+                if not self._release(name, f"RSS {rss:.0f} MB > {self.high_watermark_mb:.0f} MB"):
+                    break
+                unloaded.append(name)
+                _free_memory()
+                rss = self.rss_mb()
+
+        if unloaded:
+            _free_memory()
+            print(f"🧠 Memory governor: RSS now {self.rss_mb():.0f} MB")
+        return unloaded
+
+    def start(self):
+        """Start the background sweep thread (idempotent)."""
+        if self._thread is not None or (self.idle_ttl <= 0 and self.high_watermark_mb <= 0):
+            return
+        self._thread = threading.Thread(target=self._run, name="memory-governor", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Warning: memory governor sweep failed: {e}")
+
+
+def _free_memory():
+    gc.collect()
+    # Hand freed heap pages back to the OS so RSS actually drops (glibc only)
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+memory_governor = MemoryGovernor(
+    idle_ttl=settings.MODEL_IDLE_TTL_SECONDS,
+    high_watermark_mb=settings.MEMORY_HIGH_WATERMARK_MB,
+    check_interval=settings.MEMORY_CHECK_INTERVAL_SECONDS,
+)
@@ -0,0 +1,136 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from faster_whisper import WhisperModel
+from core.config import settings
+from services.memory_governor import MemoryGovernor, memory_governor
+
+# (model_size, compute_type, cpu_threads)
+ModelKey = Tuple[str, str, int]
+
+
+class _Entry:
+    """A resident model, its worker slots and how many callers currently hold or wait for it."""
+
+    def __init__(self, model: WhisperModel, pool_size: int):
+        self.model = model
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self.in_use = 0
+
+
+class WhisperModelRegistry:
+    """
+    Process-wide registry of resident faster-whisper models.
+
+    Each key is loaded lazily, exactly once, with `num_workers=pool_size` so the
+    same weights serve up to `pool_size` concurrent transcriptions. Callers beyond
+    that limit wait for a free slot instead of loading a second copy of the model.
+    Loaded models are registered with the memory governor, which may unload them
+    when idle or under memory pressure; the next use simply loads them again.
+    """
+
+    def __init__(self, pool_size: int = 1, device: str = "cpu", governor: MemoryGovernor = None):
+        self.pool_size = max(1, pool_size)
+        self.device = device
+        self.governor = governor
+        self._entries: Dict[ModelKey, _Entry] = {}
+        # Guards _entries and the in-use counters; held only for dict/counter updates
+        self._lock = threading.Lock()
+        # One lock per key: a model is never loaded twice, while loading (or reloading
+        # after the governor unloaded it) never blocks transcriptions on other models
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+
+    def _load(self, key: ModelKey) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                model_size, compute_type, cpu_threads = key
+                print(f"Loading Whisper model: {model_size} ({compute_type}, threads={cpu_threads or 'auto'}) on {self.device}...")
+                model = WhisperModel(
+                    model_size,
+                    device=self.device,
+                    compute_type=compute_type,
+                    cpu_threads=cpu_threads,
+                    num_workers=self.pool_size,
+                )
+                entry = _Entry(model, self.pool_size)
+                with self._lock:
+                    self._entries[key] = entry
+                print("--- Whisper Model Loaded into Memory ---")
+                if self.governor is not None:
+                    self.governor.register(
+                        self._resource_name(key),
+                        unload=lambda: self.unload(key, only_if_idle=True),
+                        busy=lambda: entry.in_use > 0,
+                    )
+        return entry
+
+    @staticmethod
+    def _resource_name(key: ModelKey) -> str:
+        return f"whisper:{key[0]}/{key[1]}/{key[2]}"
+
+    def get(self, key: ModelKey) -> WhisperModel:
+        return self._load(key).model
+
+    def peek(self, key: ModelKey) -> Optional[WhisperModel]:
+        """The resident model for `key`, without loading it."""
+        entry = self._entries.get(key)
+        return entry.model if entry is not None else None
+
+    @contextmanager
+    def acquire(self, key: ModelKey) -> Iterator[WhisperModel]:
+        """
+        Borrow a worker slot on the model for the duration of the block.
+        Segment generators from faster-whisper are lazy, so consume them inside the block.
+        """
+        while True:
+            entry = self._load(key)
+            with self._lock:
+                # Counted before waiting for a slot so the governor won't unload a model callers are queued on
+                if self._entries.get(key) is entry:
+                    entry.in_use += 1
+                    break
+
+        try:
+            entry.slots.acquire()
+            try:
+                if self.governor is not None:
+                    self.governor.touch(self._resource_name(key))
+                yield entry.model
+            finally:
+                entry.slots.release()
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+
+    def unload(self, key: ModelKey, only_if_idle: bool = False) -> bool:
+        """
+        Drop the model for `key`. With `only_if_idle` (the memory governor), nothing is
+        dropped while a caller holds or waits for it: the check and the removal happen
+        under the same lock acquire() counts under, so a model is never dropped while
+        in use and then loaded a second time next to it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (only_if_idle and entry.in_use > 0):
+                return False
+            del self._entries[key]
+        if self.governor is not None:
+            self.governor.unregister(self._resource_name(key))
+        print(f"Unloading Whisper model: {key[0]} ({key[1]})...")
+        # In-flight transcriptions keep their own reference; memory is released when they finish.
+        del entry
+        return True
+
+    def loaded_keys(self) -> List[ModelKey]:
+        return list(self._entries.keys())
+
+
+whisper_registry = WhisperModelRegistry(pool_size=settings.WHISPER_POOL_SIZE, governor=memory_governor)
@@ -0,0 +1,218 @@
+import asyncio
+import datetime
+import random
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import httpx
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from core.config import settings
+from database import SessionLocal
+from models import OutboundMessage
+
+# (chat_id, text) -> WAHA response; raises on failure
+Sender = Callable[[str, str], Awaitable[dict]]
+
+# pg_advisory_xact_lock key serializing outbox claims across processes
+OUTBOX_LOCK_KEY = 0x0B0C5E4D
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+def enqueue_outbound(db: Session, chat_id: str, text: str) -> int:
+    """Persist a reply; it becomes due after a random human-like delay."""
+    now = datetime.datetime.utcnow()
+    delay = random.uniform(settings.OUTBOUND_MIN_DELAY_SECONDS, settings.OUTBOUND_MAX_DELAY_SECONDS)
+    message = OutboundMessage(
+        chat_id=chat_id,
+        text=text,
+        status="pending",
+        attempts=0,
+        available_at=now + datetime.timedelta(seconds=delay),
+        created_at=now,
+    )
+    db.add(message)
+    db.flush()
+    message_id = message.id
+    db.commit()
+    return message_id
+
+
+def claim_next_outbound(db: Session, interval: float) -> Optional[Dict]:
+    """
+    Take the next due reply, or None. Claims from every process are serialized by an
+    advisory lock and spaced at least `interval` seconds apart (by the latest
+    claimed_at), which makes the send rate global. Only a chat's oldest unsent reply
+    is claimable, so a chat's replies keep their order, retries included.
+    """
+    now = datetime.datetime.utcnow()
+    db.execute(select(func.pg_advisory_xact_lock(OUTBOX_LOCK_KEY)))
+
+    last_claim = db.query(func.max(OutboundMessage.claimed_at)).scalar()
+    if last_claim is not None and (now - last_claim).total_seconds() < interval:
+        db.rollback()
+        return None
+
+    # A process that died mid-send leaves 'sending' rows: resend them (at-least-once)
+    db.execute(
+        update(OutboundMessage)
+        .where(
+            OutboundMessage.status == "sending",
+            OutboundMessage.claimed_at < now - datetime.timedelta(seconds=settings.OUTBOUND_SEND_TIMEOUT_SECONDS),
+        )
+        .values(status="pending", available_at=now)
+    )
+
+    earlier = aliased(OutboundMessage)
+    message = (
+        db.query(OutboundMessage)
+        .filter(
+            OutboundMessage.status == "pending",
+            OutboundMessage.available_at <= now,
+            ~exists().where(
+                earlier.chat_id == OutboundMessage.chat_id,
+                earlier.status.in_(("pending", "sending")),
+                earlier.id < OutboundMessage.id,
+            ),
+        )
+        .order_by(OutboundMessage.available_at.asc())
+        .with_for_update(skip_locked=True, of=OutboundMessage)
+        .first()
+    )
+    if message is None:
+        db.commit()
+        return None
+
+    message.status = "sending"
+    message.attempts += 1
+    message.claimed_at = now
+    claimed = {"id": message.id, "chat_id": message.chat_id, "text": message.text, "attempts": message.attempts}
+    db.commit()
+    return claimed
+
+
+def finish_outbound(db: Session, message_id: int, error: Optional[str] = None, retry_in: Optional[float] = None):
+    """Mark a claimed reply sent (no error), due again after `retry_in` seconds, or failed."""
+    now = datetime.datetime.utcnow()
+    if error is None:
+        values = {"status": "sent", "sent_at": now, "last_error": None}
+    elif retry_in is not None:
+        values = {"status": "pending", "available_at": now + datetime.timedelta(seconds=retry_in), "last_error": error[:4000]}
+    else:
+        values = {"status": "failed", "last_error": error[:4000]}
+    db.execute(update(OutboundMessage).where(OutboundMessage.id == message_id).values(**values))
+    db.commit()
+
+
+def purge_outbound_messages(db: Session) -> int:
+    """Drop delivered/failed replies older than IDEMPOTENCY_RETENTION_DAYS."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=settings.IDEMPOTENCY_RETENTION_DAYS)
+    result = db.execute(
+        delete(OutboundMessage).where(OutboundMessage.status.in_(("sent", "failed")), OutboundMessage.created_at < cutoff)
+    )
+    db.commit()
+    return result.rowcount
+
+
+class OutboundDispatcher:
+    """
+    Delivers WhatsApp replies from the outbound_messages outbox in the background,
+    so producers (the transcription workers) never wait on delivery.
+
+    Every API and worker process runs one; they share the outbox, so a reply is not
+    lost when the process that produced it restarts, and the OUTBOUND_RATE_PER_SECOND
+    limit holds across all of them (see claim_next_outbound). The human-like delay is
+    the row's available_at; transient failures (network errors, 429, 5xx) are
+    retried with exponential backoff.
+    """
+
+    def __init__(self, sender: Sender, rate_per_second: float, max_attempts: int, retry_base: float, poll_interval: float):
+        self.sender = sender
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start polling the outbox on the running loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                message = await asyncio.to_thread(_with_session, claim_next_outbound, self.interval)
+            except Exception as e:
+                print(f"❌ Outbound dispatcher: outbox unavailable: {e}")
+                await asyncio.sleep(self.poll_interval * 10)
+                continue
+            if message is None:
+                await asyncio.sleep(min(self.poll_interval, self.interval) if self.interval else self.poll_interval)
+                continue
+            task = asyncio.create_task(self._deliver(message))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, message: Dict):
+        error, retry_in = None, None
+        try:
+            await self.sender(message["chat_id"], message["text"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if message["attempts"] < self.max_attempts and _is_transient(e):
+                retry_in = self.retry_base * (2 ** (message["attempts"] - 1))
+                print(f"⚠️ WhatsApp send to {message['chat_id']} failed ({e}); retry {message['attempts']}/{self.max_attempts - 1} in {retry_in:.0f}s")
+            else:
+                print(f"❌ WhatsApp send to {message['chat_id']} failed permanently: {e}")
+        try:
+            await asyncio.to_thread(_with_session, finish_outbound, message["id"], error, retry_in)
+        except Exception as e:
+            # Stays 'sending' and is resent after OUTBOUND_SEND_TIMEOUT_SECONDS
+            print(f"❌ Outbound dispatcher: could not record delivery of message {message['id']}: {e}")
+
+    async def drain(self, timeout: float = 30.0):
+        """Stop claiming and wait for sends in progress (used on shutdown); the rest stays in the outbox."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        tasks = list(self._in_flight)
+        if tasks:
+            print(f"📤 Finishing {len(tasks)} outbound WhatsApp sends...")
+            await asyncio.wait(tasks, timeout=timeout)
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.RequestError)
+
+
+_dispatcher: Optional[OutboundDispatcher] = None
+_dispatcher_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_outbound_dispatcher() -> OutboundDispatcher:
+    """The dispatcher for the running event loop (one per process: API or worker)."""
+    global _dispatcher, _dispatcher_loop
+    loop = asyncio.get_running_loop()
+    if _dispatcher is None or _dispatcher_loop is not loop:
+        from services.waha import post_text
+        _dispatcher = OutboundDispatcher(
+            sender=post_text,
+            rate_per_second=settings.OUTBOUND_RATE_PER_SECOND,
+            max_attempts=settings.OUTBOUND_MAX_ATTEMPTS,
+            retry_base=settings.OUTBOUND_RETRY_BASE_SECONDS,
+            poll_interval=settings.OUTBOUND_POLL_INTERVAL_SECONDS,
+        )
+        _dispatcher_loop = loop
+    return _dispatcher
@@ -0,0 +1,141 @@
+import select
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+NOTIFY_CHANNEL = "patient_cache"
+
+# (tenant_id, "cpf" | "name", value)
+CacheKey = Tuple[Optional[uuid.UUID], str, str]
+
+
+class PatientCache:
+    """
+    Bounded LRU map from (tenant, CPF or normalized name/alias) to patient id, so
+    repeat consultations for known patients resolve without touching the database.
+
+    Entries expire after `ttl` seconds. Patient writes outside the agent (API
+    endpoints) call invalidate_patient(), which drops the tenant's entries here and,
+    through Postgres NOTIFY, in every worker process running the listener.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, tenant_id: Optional[uuid.UUID], kind: str, value: str) -> Optional[int]:
+        if not self.enabled or not value:
+            return None
+        key = (tenant_id, kind, value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, tenant_id: Optional[uuid.UUID], patient_id: int, cpf: Optional[str] = None, names: Iterable[str] = ()):
+        if not self.enabled:
+            return
+        expires = time.monotonic() + self.ttl
+        keys = [(tenant_id, "name", name) for name in names if name]
+        if cpf:
+            keys.append((tenant_id, "cpf", cpf))
+        with self._lock:
+            for key in keys:
+                self._entries[key] = (expires, patient_id)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_tenant(self, tenant_id: Optional[uuid.UUID]):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == tenant_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+patient_cache = PatientCache(max_entries=settings.PATIENT_CACHE_MAX_ENTRIES, ttl=settings.PATIENT_CACHE_TTL_SECONDS)
+
+
+def put_after_commit(db: Session, tenant_id: Optional[uuid.UUID], patient_id: int, cpf: Optional[str] = None, names: Iterable[str] = ()):
+    """Cache a lookup once `db` commits, so a patient from a rolled-back transaction is never cached."""
+    names = list(names)
+    event.listen(db, "after_commit", lambda session: patient_cache.put(tenant_id, patient_id, cpf=cpf, names=names), once=True)
+
+
+def invalidate_patient(db: Session, tenant_id: Optional[uuid.UUID]):
+    """
+    Call in the transaction that creates/updates a patient (before commit). Drops the
+    tenant's cached lookups in this process; the NOTIFY is delivered to listening
+    workers when the transaction commits.
+    """
+    patient_cache.invalidate_tenant(tenant_id)
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": str(tenant_id or "")})
+
+
+def _listen():
+    from database import engine
+
+    while True:
+        connection = None
+        try:
+            connection = engine.raw_connection()
+            # A dedicated connection: never returned to the pool in autocommit mode
+            connection.detach()
+            dbapi = connection.dbapi_connection
+            dbapi.autocommit = True
+            with dbapi.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            # Anything written while we were not listening may be cached: start clean
+            patient_cache.clear()
+            while True:
+                if select.select([dbapi], [], [], 30)[0]:
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        payload = dbapi.notifies.pop(0).payload
+                        patient_cache.invalidate_tenant(uuid.UUID(payload) if payload else None)
+        except Exception as e:
+            print(f"Warning: patient cache listener failed ({e}); reconnecting")
+            traceback.print_exc()
+            time.sleep(5)
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+
+_listener: Optional[threading.Thread] = None
+
+
+def start_invalidation_listener():
+    """Background LISTEN on the invalidation channel (psycopg2). Idempotent."""
+    global _listener
+    if _listener is not None or not patient_cache.enabled:
+        return
+    _listener = threading.Thread(target=_listen, name="patient-cache-listener", daemon=True)
+    _listener.start()
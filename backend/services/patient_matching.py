@@ -0,0 +1,163 @@
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import and_, false, func, literal, or_
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.text import normalize_text, phone_key, phonetic_key
+from models import Patient
+
+
+class PatientMatch:
+    def __init__(self, patient_id: int, name: str, confidence: float, reasons: List[str]):
+        self.patient_id = patient_id
+        self.name = name
+        self.confidence = confidence
+        self.reasons = reasons
+
+    @property
+    def exact(self) -> bool:
+        """Matched by CPF or by the exact normalized name/alias (no fuzzy step involved)."""
+        return bool({"cpf", "name", "alias"} & set(self.reasons))
+
+    @property
+    def corroborated(self) -> bool:
+        """Backed by an identifier (CPF or the chat's phone), not by the name alone."""
+        return bool({"cpf", "phone"} & set(self.reasons))
+
+    def __repr__(self):
+        return f"PatientMatch(id={self.patient_id}, name={self.name!r}, confidence={self.confidence:.2f}, reasons={self.reasons})"
+
+
+def tenant_filter(tenant_id: Optional[uuid.UUID]):
+    # Plain equality / IS NULL (not IS NOT DISTINCT FROM) so Postgres can use the tenant indexes
+    return Patient.tenant_id == tenant_id if tenant_id is not None else Patient.tenant_id.is_(None)
+
+
+def find_candidates(
+    db: Session,
+    name: Optional[str],
+    cpf: Optional[str] = None,
+    phone: Optional[str] = None,
+    tenant_id: Optional[uuid.UUID] = None,
+) -> List[PatientMatch]:
+    """
+    Rank the tenant's patients that may be the person described, best first.
+
+    Candidates come from one indexed query (CPF, phone key, trigram word similarity
+    on the normalized name, phonetic key, normalized aliases) limited to
+    PATIENT_MATCH_CANDIDATES, then are scored by score_candidate().
+    """
+    target = normalize_text(name)
+    phonetic = phonetic_key(name)
+    phone = phone_key(phone)
+
+    conditions = []
+    if cpf:
+        conditions.append(Patient.cpf == cpf)
+    if phone:
+        conditions.append(Patient.phone_key == phone)
+    if target:
+        conditions += [
+            Patient.name_normalized == target,
+            Patient.aliases_normalized.contains([target]),
+            # word_similarity(target, name) above pg_trgm.word_similarity_threshold (GIN trigram index)
+            Patient.name_normalized.op("%>")(target),
+        ]
+    if phonetic:
+        first_word = phonetic.split(" ")[0]
+        conditions += [
+            Patient.name_phonetic == phonetic,
+            Patient.name_phonetic == first_word,
+            Patient.name_phonetic.like(first_word + " %"),
+        ]
+    if not conditions:
+        return []
+
+    # Symmetric similarity only: word_similarity would let "maria" score high against
+    # any longer name containing it ("mariana costa", "maria souza")
+    similarity = func.similarity(Patient.name_normalized, target) if target else literal(0.0)
+    # Untenanted patients (registered before tenants, or via the API without X-Tenant-ID)
+    # are still found by CPF, so a known CPF is never registered a second time
+    legacy = [and_(Patient.tenant_id.is_(None), Patient.cpf == cpf)] if cpf and tenant_id is not None else []
+    # Exact CPF hits must survive the LIMIT even when the transcribed name is far off,
+    # the tenant's own record first
+    ordering = [func.coalesce(Patient.cpf == cpf, false()).desc(), Patient.tenant_id.is_(None).asc()] if cpf else []
+    ordering.append(similarity.desc())
+    rows = (
+        db.query(
+            Patient.id,
+            Patient.name,
+            Patient.cpf,
+            Patient.phone_key,
+            Patient.name_normalized,
+            Patient.aliases_normalized,
+            similarity.label("similarity"),
+        )
+        .filter(or_(and_(tenant_filter(tenant_id), or_(*conditions)), *legacy))
+        .order_by(*ordering)
+        .limit(settings.PATIENT_MATCH_CANDIDATES)
+        .all()
+    )
+
+    matches = [score_candidate(row, target, cpf, phone) for row in rows]
+    matches = [match for match in matches if match is not None]
+    # Ties: a CPF match outranks a same-name patient (its CPF is what a new record would collide with)
+    return sorted(matches, key=lambda match: (match.confidence, "cpf" in match.reasons, match.exact), reverse=True)
+
+
+def score_candidate(row, target: str, cpf: Optional[str] = None, phone: Optional[str] = None) -> Optional[PatientMatch]:
+    """
+    Score one candidate row (id, name, cpf, phone_key, name_normalized,
+    aliases_normalized, similarity) against the normalized name, CPF and phone key:
+      - same CPF: 1.0; a different CPF on file rules the candidate out
+      - name: pg_trgm similarity, 1.0 for an exact normalized name/alias. Phonetic
+        keys only retrieve candidates: different names share them ("lucia"/"luisa")
+      - same phone (from the WhatsApp chat) adds PATIENT_MATCH_PHONE_BOOST
+    """
+    if cpf and row.cpf:
+        if row.cpf != cpf:
+            return None
+        return PatientMatch(row.id, row.name, 1.0, ["cpf"])
+
+    reasons = []
+    score = float(row.similarity or 0.0)
+    if target and row.name_normalized == target:
+        score = 1.0
+        reasons.append("name")
+    elif target and target in (row.aliases_normalized or []):
+        score = 1.0
+        reasons.append("alias")
+    elif score > 0:
+        reasons.append("trigram")
+
+    if phone and row.phone_key == phone:
+        score = min(1.0, score + settings.PATIENT_MATCH_PHONE_BOOST)
+        reasons.append("phone")
+    return PatientMatch(row.id, row.name, round(score, 3), reasons)
+
+
+def best_match(
+    db: Session,
+    name: Optional[str],
+    cpf: Optional[str] = None,
+    phone: Optional[str] = None,
+    tenant_id: Optional[uuid.UUID] = None,
+) -> Optional[PatientMatch]:
+    """
+    The top candidate if its confidence reaches PATIENT_MATCH_THRESHOLD and no other
+    candidate comes within PATIENT_MATCH_AMBIGUITY_MARGIN of it, else None.
+    """
+    return pick_best(find_candidates(db, name, cpf, phone, tenant_id), name)
+
+
+def pick_best(candidates: List[PatientMatch], name: Optional[str] = None) -> Optional[PatientMatch]:
+    if not candidates or candidates[0].confidence < settings.PATIENT_MATCH_THRESHOLD:
+        return None
+    best = candidates[0]
+    # A CPF identifies one patient (the column is unique); anything else must be unambiguous
+    if "cpf" not in best.reasons and len(candidates) > 1 and candidates[1].confidence >= best.confidence - settings.PATIENT_MATCH_AMBIGUITY_MARGIN:
+        print(f"⚠️ Ambiguous patient match for '{name}', not attaching: {candidates[:2]}")
+        return None
+    return best
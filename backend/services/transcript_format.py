@@ -0,0 +1,86 @@
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+
+# Columnar transcript layout stored in MedicalRecord.transcript_segments:
+#
+# {
+#   "version": 1,
+#   "segments": {"start": [...], "end": [...], "text": [...],
+#                "avg_logprob": [...], "no_speech_prob": [...],
+#                "word_index": [...],           # first word of each segment (len = n_segments + 1)
+#                "speaker": [...]},             # index into "speakers", only when diarized
+#   "speakers": ["clinician", "other"],         # only when diarized
+#   "words": {"start": [...], "end": [...], "word": [...], "probability": [...]}
+# }
+#
+# Parallel arrays instead of one object per word keep the JSON small and let
+# readers slice segment ranges (and their words) without touching the rest.
+COLUMNAR_VERSION = 1
+SEGMENT_FIELDS = ("start", "end", "text", "avg_logprob", "no_speech_prob")
+WORD_FIELDS = ("start", "end", "word", "probability")
+
+
+def _round(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return None if value is None else round(float(value), digits)
+
+
+def to_columnar(segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    seg_cols = {field: [] for field in SEGMENT_FIELDS}
+    seg_cols["word_index"] = [0]
+    word_cols = {field: [] for field in WORD_FIELDS}
+
+    for segment in segments:
+        seg_cols["start"].append(_round(segment["start"]))
+        seg_cols["end"].append(_round(segment["end"]))
+        seg_cols["text"].append(segment["text"])
+        seg_cols["avg_logprob"].append(_round(segment.get("avg_logprob"), 3))
+        seg_cols["no_speech_prob"].append(_round(segment.get("no_speech_prob"), 3))
+        for word in segment.get("words") or []:
+            word_cols["start"].append(_round(word["start"]))
+            word_cols["end"].append(_round(word["end"]))
+            word_cols["word"].append(word["word"])
+            word_cols["probability"].append(_round(word.get("probability"), 3))
+        seg_cols["word_index"].append(len(word_cols["word"]))
+
+    result = {"version": COLUMNAR_VERSION, "segments": seg_cols, "words": word_cols}
+    if segments and "speaker" in segments[0]:
+        speakers = sorted({segment["speaker"] for segment in segments})
+        seg_cols["speaker"] = [speakers.index(segment["speaker"]) for segment in segments]
+        result["speakers"] = speakers
+    return result
+
+
+def slice_columnar(data: Dict[str, Any], offset: int = 0, limit: int = 100, include_words: bool = False) -> Dict[str, Any]:
+    """Return segments [offset, offset + limit) and, optionally, only the words they contain."""
+    seg_cols = data["segments"]
+    total = len(seg_cols["start"])
+    stop = min(total, offset + limit)
+
+    result = {
+        "total_segments": total,
+        "offset": offset,
+        "limit": limit,
+        "segments": {field: seg_cols[field][offset:stop] for field in SEGMENT_FIELDS},
+    }
+    if "speaker" in seg_cols:
+        result["segments"]["speaker"] = seg_cols["speaker"][offset:stop]
+        result["speakers"] = data["speakers"]
+    if include_words:
+        word_index = seg_cols["word_index"]
+        first, last = word_index[min(offset, total)], word_index[stop]
+        result["segments"]["word_index"] = [i - first for i in word_index[offset:stop + 1]]
+        result["words"] = {field: data["words"][field][first:last] for field in WORD_FIELDS}
+    return result
+
+
+def is_confident(segment: Dict[str, Any]) -> bool:
+    """
+    Whisper's own heuristic for hallucinated/silent regions: high no-speech
+    probability together with a low average log-probability.
+    """
+    no_speech = segment.get("no_speech_prob")
+    avg_logprob = segment.get("avg_logprob")
+    if no_speech is None or avg_logprob is None:
+        return True
+    return not (no_speech > settings.TRANSCRIPT_MAX_NO_SPEECH_PROB and avg_logprob < settings.TRANSCRIPT_MIN_AVG_LOGPROB)
@@ -1,51 +1,216 @@
-from faster_whisper import WhisperModel
-import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from core.config import settings
+from services.audio import SAMPLING_RATE, to_pcm
+from services.audio_chunking import concat_segments, plan_chunks, stitch_segments
+from services.transcription_cache import get_transcription_cache
+from services.model_registry import ModelKey, WhisperModelRegistry, whisper_registry
 # import torch
 
+def _audio_bytes(audio) -> bytes:
+    """Raw bytes identifying the audio content (encoded bytes, file contents or PCM samples)."""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return bytes(audio)
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            return f.read()
+    return audio.tobytes()
+
 class TranscriptionService:
-    def __init__(self, model_size="medium", device="cpu", compute_type=None):
-        self.model_size = model_size
+    def __init__(self, model_size=None, device="cpu", compute_type=None, cpu_threads=None, beam_size=5, temperature=None, registry: WhisperModelRegistry = None):
+        self.model_size = model_size or settings.WHISPER_MODEL_SIZE
         self.device = "cpu"
         # Auto-select compute type based on device
+        compute_type = compute_type or settings.WHISPER_COMPUTE_TYPE
         if compute_type is None:
             self.compute_type = "float16" if self.device == "cuda" else "int8"
         else:
             self.compute_type = compute_type
-        self.model = None
-        # Preload model to avoid cold start
-        self.load_model()
+        self.cpu_threads = settings.WHISPER_CPU_THREADS if cpu_threads is None else cpu_threads
+        self.beam_size = beam_size
+        # None keeps faster-whisper's temperature fallback; 0.0 forces pure greedy/beam decoding
+        self.temperature = temperature
+        # Models live in the shared registry and are loaded lazily on first use,
+        # so every service with the same key reuses one resident model.
+        self.registry = registry or whisper_registry
+
+    @property
+    def model_key(self) -> ModelKey:
+        return (self.model_size, self.compute_type, self.cpu_threads)
+
+    @property
+    def model(self):
+        # Never cached on the service: holding a reference would keep an unloaded model in memory
+        return self.registry.peek(self.model_key)
 
     def load_model(self):
-        if self.model is None:
-            print(f"Loading Whisper model: {self.model_size} on {self.device}...")
-            self.model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
-            print("--- Whisper Model Loaded into Memory ---")
+        self.registry.get(self.model_key)
 
     def unload_model(self):
-        if self.model is not None:
-            print("Unloading Whisper model...")
-            del self.model
-            self.model = None
-            self.device = "cpu"
+        if self.registry.unload(self.model_key):
             print("Whisper model unloaded.")
 
-    def transcribe(self, audio_path: str):
-        self.load_model()
-        try:
-            segments, info = self.model.transcribe(audio_path, beam_size=5)
-            
+    def iter_segments(self, audio, word_timestamps: bool = False):
+        """
+        Yield segments as faster-whisper decodes them:
+        {"start", "end", "text", "avg_logprob", "no_speech_prob"} plus
+        "words" ([{"start", "end", "word", "probability"}]) when `word_timestamps` is set.
+        `audio` is a file path, encoded audio bytes or a 16 kHz mono float32 array.
+        The model slot is held until the generator is exhausted or closed.
+        """
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            audio = to_pcm(audio)
+        with self.registry.acquire(self.model_key) as model:
+            options = {"beam_size": self.beam_size, "word_timestamps": word_timestamps}
+            if self.temperature is not None:
+                options["temperature"] = self.temperature
+            segments, info = model.transcribe(audio, **options)
+
             # print("Detected language '%s' with probability %f" % (info.language, info.language_probability))
 
-            transcription = []
             for segment in segments:
-                transcription.append(segment.text)
                 # print("[%.2fs -> %.2fs] %s" % (segment.start, segment.end, segment.text))
-            
-            full_text = " ".join(transcription)
-            return full_text
-        finally:
-            # Optional: Unload model after transcription to save VRAM for LLM
-            # For now, we will keep it loaded unless we hit memory issues, 
-            # but the method is here if we need to enforce strict VRAM management.
-            # self.unload_model() 
-            pass
+                item = {
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text,
+                    "avg_logprob": segment.avg_logprob,
+                    "no_speech_prob": segment.no_speech_prob,
+                }
+                if word_timestamps:
+                    item["words"] = [
+                        {"start": w.start, "end": w.end, "word": w.word, "probability": w.probability}
+                        for w in segment.words or []
+                    ]
+                yield item
+
+    def transcribe_segments(self, audio, parallel: bool = False, word_timestamps: bool = False):
+        """
+        Transcribe to a list of segments.
+        Results are cached on disk by audio content hash and decoding settings, so
+        re-delivered or forwarded voice notes skip Whisper entirely.
+        With `parallel=True`, recordings longer than WHISPER_PARALLEL_MIN_SECONDS are split
+        at VAD silence boundaries and the chunks are transcribed concurrently on the shared
+        model (up to WHISPER_POOL_SIZE at once), then stitched back in time order.
+        """
+        cache = get_transcription_cache()
+        cache_key = None
+        if cache is not None:
+            try:
+                cache_key = cache.make_key(
+                    _audio_bytes(audio),
+                    model=self.model_size,
+                    compute=self.compute_type,
+                    beam=self.beam_size,
+                    temperature=self.temperature,
+                    words=word_timestamps,
+                )
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                print(f"Transcription cache MISS | hits={cache.hits} misses={cache.misses}")
+            except Exception as e:
+                print(f"Warning: transcription cache lookup failed: {e}")
+                cache_key = None
+
+        segments = self._transcribe_uncached(audio, parallel, word_timestamps)
+
+        if cache_key is not None:
+            try:
+                cache.set(cache_key, segments)
+            except Exception as e:
+                print(f"Warning: transcription cache write failed: {e}")
+        return segments
+
+    def _transcribe_uncached(self, audio, parallel: bool, word_timestamps: bool):
+        # Decode once into memory; VAD, chunking and Whisper all share this buffer
+        audio = to_pcm(audio)
+        if not parallel:
+            return list(self.iter_segments(audio, word_timestamps))
+
+        if len(audio) < settings.WHISPER_PARALLEL_MIN_SECONDS * SAMPLING_RATE:
+            return list(self.iter_segments(audio, word_timestamps))
+
+        speech = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500), sampling_rate=SAMPLING_RATE)
+        chunks = plan_chunks(
+            speech,
+            total_samples=len(audio),
+            sampling_rate=SAMPLING_RATE,
+            max_chunk_s=settings.WHISPER_CHUNK_SECONDS,
+            overlap_s=settings.WHISPER_CHUNK_OVERLAP_SECONDS,
+        )
+        print(f"--- Parallel transcription: {len(audio) / SAMPLING_RATE:.0f}s audio in {len(chunks)} chunks ---")
+        if len(chunks) <= 1:
+            return list(self.iter_segments(audio, word_timestamps))
+
+        def run_chunk(chunk):
+            _, _, start, end = chunk
+            return chunk, list(self.iter_segments(audio[start:end], word_timestamps))
+
+        # Threads, not processes: CTranslate2 releases the GIL and the registry's
+        # num_workers lets one resident model serve every chunk concurrently.
+        with ThreadPoolExecutor(max_workers=self.registry.pool_size) as executor:
+            results = list(executor.map(run_chunk, chunks))
+
+        return stitch_segments(results, sampling_rate=SAMPLING_RATE)
+
+    def transcribe_parts(self, parts, word_timestamps: bool = False):
+        """
+        Transcribe several recordings that belong together (consecutive voice notes)
+        concurrently on the shared model and return one segment list in their order,
+        timestamps continuing across recordings. Each part is cached on its own.
+        Returns (segments, pcm) where pcm is the concatenated audio.
+        """
+        pcm_parts = [to_pcm(part) for part in parts]
+
+        def run_part(pcm):
+            return len(pcm) / SAMPLING_RATE, self.transcribe_segments(pcm, parallel=True, word_timestamps=word_timestamps)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(pcm_parts), self.registry.pool_size))) as executor:
+            results = list(executor.map(run_part, pcm_parts))
+
+        return concat_segments(results), np.concatenate(pcm_parts) if pcm_parts else np.zeros(0, dtype=np.float32)
+
+    def transcribe(self, audio, parallel: bool = False):
+        transcription = [segment["text"] for segment in self.transcribe_segments(audio, parallel=parallel)]
+        full_text = " ".join(transcription)
+        return full_text
+
+# Named quality profiles. Each maps to its own registry key, so every profile
+# in use keeps its own warm model.
+TRANSCRIPTION_PROFILES = {
+    # Short notes ("ok, próximo paciente"): small model, greedy decoding, no fallback
+    "fast": {"model_size": "small", "compute_type": "int8", "beam_size": 1, "temperature": 0.0},
+    # Default: the historical medium / beam 5 setup
+    "balanced": {"model_size": settings.WHISPER_MODEL_SIZE, "compute_type": settings.WHISPER_COMPUTE_TYPE, "beam_size": 5},
+    "accurate": {"model_size": "large-v3", "compute_type": "int8", "beam_size": 5},
+}
+
+def resolve_profile(requested: str = None, tenant_config: dict = None) -> str:
+    """
+    Pick the profile for a request: explicit request > tenant config
+    (`Tenant.config["transcription_profile"]`) > WHISPER_DEFAULT_PROFILE.
+    Raises ValueError for an unknown explicit profile; an unknown tenant value is ignored.
+    """
+    if requested:
+        if requested not in TRANSCRIPTION_PROFILES:
+            raise ValueError(f"Unknown transcription profile '{requested}'. Available: {', '.join(TRANSCRIPTION_PROFILES)}")
+        return requested
+    tenant_profile = (tenant_config or {}).get("transcription_profile")
+    if tenant_profile in TRANSCRIPTION_PROFILES:
+        return tenant_profile
+    return settings.WHISPER_DEFAULT_PROFILE
+
+@lru_cache(maxsize=None)
+def _profile_service(profile: str) -> TranscriptionService:
+    if profile not in TRANSCRIPTION_PROFILES:
+        raise ValueError(f"Unknown transcription profile '{profile}'")
+    return TranscriptionService(**TRANSCRIPTION_PROFILES[profile])
+
+def get_transcription_service(profile: str = None) -> TranscriptionService:
+    """
+    Shared TranscriptionService per profile for the API and the agent graph.
+    """
+    return _profile_service(profile or settings.WHISPER_DEFAULT_PROFILE)
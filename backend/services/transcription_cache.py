@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from core.config import settings
+
+
+class TranscriptionCache:
+    """
+    On-disk cache of transcriptions keyed by SHA-256 of the audio plus the decoding settings.
+
+    Entries are zlib-compressed JSON segment lists in a single SQLite file, readable
+    only by the owner. They hold patient health data, so retention is bounded: an
+    entry is deleted `ttl_seconds` after it was created (TRANSCRIPTION_CACHE_TTL_HOURS),
+    however often it is read, and when the total payload exceeds `max_bytes` the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float = 0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    created REAL NOT NULL
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(transcriptions)")}
+            if "created" not in columns:
+                # Cache files from before age-based expiry: their entries age from now
+                conn.execute(f"ALTER TABLE transcriptions ADD COLUMN created REAL NOT NULL DEFAULT {time.time()}")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_transcriptions_last_access ON transcriptions (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_transcriptions_created ON transcriptions (created)")
+            self._expire(conn)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.chmod(path + suffix, 0o600)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:  # commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(audio_bytes: bytes, **params) -> str:
+        digest = hashlib.sha256(audio_bytes).hexdigest()
+        suffix = "|".join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{digest}|{suffix}"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        started = time.perf_counter()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM transcriptions WHERE key = ? AND created >= ?", (key, self._cutoff())
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE transcriptions SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        segments = json.loads(zlib.decompress(row[0]))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"⚡ Transcription cache HIT ({elapsed_ms:.1f} ms) | hits={self.hits} misses={self.misses}")
+        return segments
+
+    def set(self, key: str, segments: List[Dict]):
+        payload = zlib.compress(json.dumps(segments, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, payload, size, last_access, created) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._expire(conn)
+            self._evict(conn)
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def _expire(self, conn: sqlite3.Connection):
+        if self.ttl_seconds <= 0:
+            return
+        expired = conn.execute("DELETE FROM transcriptions WHERE created < ?", (self._cutoff(),)).rowcount
+        if expired:
+            print(f"🧹 Transcription cache expired {expired} entries older than {self.ttl_seconds / 3600:g}h")
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM transcriptions ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM transcriptions WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        print(f"🧹 Transcription cache evicted {evicted} entries (now {total} bytes)")
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcriptions").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+_cache: Optional[TranscriptionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_transcription_cache() -> Optional[TranscriptionCache]:
+    """Shared cache instance, or None when TRANSCRIPTION_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.TRANSCRIPTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = TranscriptionCache(
+                        settings.TRANSCRIPTION_CACHE_PATH,
+                        max_bytes=settings.TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024,
+                        ttl_seconds=settings.TRANSCRIPTION_CACHE_TTL_HOURS * 3600,
+                    )
+                except (OSError, sqlite3.Error) as e:
+                    # No writable cache volume: transcribe without caching rather than fail
+                    print(f"⚠️ Transcription cache disabled ({settings.TRANSCRIPTION_CACHE_PATH}: {e})")
+                    settings.TRANSCRIPTION_CACHE_ENABLED = False
+                    return None
+    return _cache
@@ -1,9 +1,12 @@
+import asyncio
 import os
 import httpx
-import asyncio
-import random
 import traceback
 from datetime import datetime
+from typing import Optional
+
+from core.http import get_http_client
+from services.outbound import _with_session, enqueue_outbound
 
 # Configuration
 WAHA_BASE_URL = os.getenv("WAHA_BASE_URL", "http://waha:3000")
@@ -13,15 +16,11 @@ def log_with_timestamp(message: str):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] {message}")
 
-async def send_message(chat_id: str, text: str):
+async def post_text(chat_id: str, text: str, client: Optional[httpx.AsyncClient] = None) -> dict:
     """
-    Envia uma mensagem de texto para um utilizador via WAHA.
-    'chat_id' deve ser o número normalizado.
+    Envia o texto imediatamente via WAHA (sem atraso). Levanta exceção em caso de falha,
+    para que o dispatcher (services/outbound.py) decida se deve tentar novamente.
     """
-    # Simulate human-like delay
-    tempo_de_espera = random.uniform(1.0, 3.0)
-    await asyncio.sleep(tempo_de_espera)
-    
     endpoint = f"{WAHA_BASE_URL}/api/sendText"
     
     # Ensure chat_id has suffix if missing (simple heuristic, though usually passed correctly)
@@ -41,20 +40,24 @@ async def send_message(chat_id: str, text: str):
     if WAHA_API_KEY:
         headers["X-Api-Key"] = WAHA_API_KEY
 
+    log_with_timestamp(f"WAHA reply to: {waha_chat_id} | Message: \"{text[:100]}...\"")
+    client = client or get_http_client()
+    response = await client.post(endpoint, json=payload, headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+async def send_message(chat_id: str, text: str):
+    """
+    Enfileira uma mensagem de texto para um utilizador via WAHA.
+    'chat_id' deve ser o número normalizado.
+    Retorna assim que a mensagem está gravada na outbox (outbound_messages): o atraso
+    "humano", o limite de envio e as novas tentativas são aplicados pelo dispatcher
+    de saída, em qualquer processo, fora do fluxo do chamador.
+    """
     try:
-        log_with_timestamp(f"WAHA reply to: {waha_chat_id} | Message: \"{text[:100]}...\"")
-        async with httpx.AsyncClient() as client:
-            response = await client.post(endpoint, json=payload, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-    except httpx.RequestError as e:
-        log_with_timestamp(f"ERRO ao conectar com o WAHA: {e}")
-        # We don't raise here to avoid crashing the agent flow, but we log it.
-        return {"error": str(e)}
-    except httpx.HTTPStatusError as e:
-        log_with_timestamp(f"ERRO na API do WAHA (sendText): {e.response.status_code} - {e.response.text}")
-        return {"error": f"HTTP {e.response.status_code}: {e.response.text}"}
+        message_id = await asyncio.to_thread(_with_session, enqueue_outbound, chat_id, text)
+        return {"status": "queued", "id": message_id}
     except Exception as e:
-        log_with_timestamp(f"ERRO desconhecido ao enviar mensagem WAHA: {e}")
+        log_with_timestamp(f"ERRO desconhecido ao enfileirar mensagem WAHA: {e}")
         traceback.print_exc()
         return {"error": str(e)}
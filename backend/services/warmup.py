@@ -0,0 +1,75 @@
+import datetime
+import io
+import time
+import traceback
+import wave
+from typing import Any, Dict, List
+
+from core.config import settings
+from services.audio import SAMPLING_RATE
+from services.model_registry import ModelKey, whisper_registry
+from services.transcription import get_transcription_service
+
+# Process readiness, exposed by /healthz/ready
+readiness: Dict[str, Any] = {
+    "ready": False,
+    "models": [],
+    "error": None,
+    "started_at": None,
+    "finished_at": None,
+}
+
+_warmed_keys: List[ModelKey] = []
+
+
+def current_readiness() -> Dict[str, Any]:
+    """
+    Ready once warm-up succeeded: every configured model loaded and ran, so it is
+    known to be loadable. The memory governor may unload idle models afterwards (the
+    next request reloads them); "resident" reports which ones are in memory right now.
+    """
+    resident = set(whisper_registry.loaded_keys())
+    return {**readiness, "resident": [key[0] for key in _warmed_keys if key in resident]}
+
+
+def silent_clip(seconds: float = 1.0) -> bytes:
+    """A short 16 kHz mono WAV of silence, encoded so warm-up also exercises the decoder."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLING_RATE)
+        wav.writeframes(b"\x00\x00" * int(seconds * SAMPLING_RATE))
+    return buffer.getvalue()
+
+
+def configured_profiles() -> List[str]:
+    return [p.strip() for p in settings.WHISPER_WARMUP_PROFILES.split(",") if p.strip()]
+
+
+def warm_up_models(profiles: List[str] = None):
+    """
+    Load each profile's Whisper model and run one inference on silence so the first
+    real request doesn't pay load time or first-call allocation. Blocking; run it in a thread.
+    """
+    profiles = configured_profiles() if profiles is None else profiles
+    readiness.update(ready=False, models=[], error=None, started_at=datetime.datetime.utcnow().isoformat())
+    _warmed_keys.clear()
+    clip = silent_clip()
+    try:
+        for profile in profiles:
+            started = time.perf_counter()
+            service = get_transcription_service(profile)
+            service.load_model()
+            list(service.iter_segments(clip))
+            elapsed = time.perf_counter() - started
+            readiness["models"].append({"profile": profile, "model_size": service.model_size, "warmup_seconds": round(elapsed, 2)})
+            _warmed_keys.append(service.model_key)
+            print(f"🔥 Warmed up Whisper profile '{profile}' ({service.model_size}) in {elapsed:.1f}s")
+        readiness["ready"] = True
+    except Exception as e:
+        readiness["error"] = f"{type(e).__name__}: {e}"
+        print(f"❌ Model warm-up failed: {e}")
+        traceback.print_exc()
+    finally:
+        readiness["finished_at"] = datetime.datetime.utcnow().isoformat()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Importing models builds the SQLAlchemy engine; unit tests never connect to it
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
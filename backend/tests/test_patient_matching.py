@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from core.text import normalize_text, phone_key, phonetic_key
+from services.patient_matching import PatientMatch, pick_best, score_candidate
+
+
+def _row(id, name, similarity, cpf=None, phone_key=None, aliases=()):
+    return SimpleNamespace(
+        id=id,
+        name=name,
+        cpf=cpf,
+        phone_key=phone_key,
+        name_normalized=normalize_text(name),
+        aliases_normalized=[normalize_text(alias) for alias in aliases],
+        similarity=similarity,
+    )
+
+
+def test_phonetic_key_spelling_variants_share_a_key():
+    assert phonetic_key("Antônio Tiago") == phonetic_key("Anthonio Thiago")
+    assert phonetic_key("Conceição") == phonetic_key("Conseissão")
+
+
+def test_phonetic_key_keeps_gender_vowel():
+    assert phonetic_key("Antonio") != phonetic_key("Antonia")
+
+
+def test_phonetic_key_collides_for_different_names():
+    # Why phonetic keys only retrieve candidates and never score them
+    assert phonetic_key("Lúcia Silva") == phonetic_key("Luísa Silva")
+
+
+def test_phone_key_ignores_country_code_and_chat_suffix():
+    assert phone_key("5511987654321@c.us") == phone_key("(11) 98765-4321") == "87654321"
+    assert phone_key("1234") == ""
+
+
+def test_score_uses_symmetric_similarity_for_partial_names():
+    match = score_candidate(_row(1, "Mariana Costa", 0.36), "maria")
+    assert match.confidence == 0.36
+    assert match.reasons == ["trigram"]
+
+
+def test_score_phonetic_collision_is_not_a_match():
+    match = score_candidate(_row(1, "Luísa Silva", 0.5), "lucia silva")
+    assert match.confidence < 0.8
+    assert not match.exact
+
+
+def test_score_exact_name_and_alias():
+    assert score_candidate(_row(1, "Maria Silva", 1.0), "maria silva").reasons == ["name"]
+    alias = score_candidate(_row(1, "Antônio Carlos", 0.4, aliases=["Antonho Carlos"]), "antonho carlos")
+    assert (alias.confidence, alias.reasons) == (1.0, ["alias"])
+
+
+def test_score_cpf_match_and_conflict():
+    assert score_candidate(_row(1, "João", 0.1, cpf="123"), "maria", cpf="123").reasons == ["cpf"]
+    assert score_candidate(_row(1, "Maria", 1.0, cpf="999"), "maria", cpf="123") is None
+
+
+def test_score_phone_boost_corroborates():
+    match = score_candidate(_row(1, "Antônio Carlos", 0.7, phone_key="87654321"), "antonho carlos", phone="87654321")
+    assert match.confidence == 0.85
+    assert match.corroborated and not match.exact
+
+
+def test_pick_best_rejects_ambiguous_names():
+    candidates = [PatientMatch(1, "Maria Silva", 0.9, ["trigram"]), PatientMatch(2, "Maria Souza", 0.88, ["trigram"])]
+    assert pick_best(candidates, "maria") is None
+
+
+def test_pick_best_threshold_and_clear_winner():
+    assert pick_best([PatientMatch(1, "Maria Silva", 0.7, ["trigram"])]) is None
+    winner = PatientMatch(1, "Maria Silva", 1.0, ["name"])
+    assert pick_best([winner, PatientMatch(2, "Maria Souza", 0.6, ["trigram"])]) is winner
+
+
+def test_pick_best_cpf_wins_over_close_runner_up():
+    winner = PatientMatch(1, "Maria Silva", 1.0, ["cpf"])
+    assert pick_best([winner, PatientMatch(2, "Maria Silva", 1.0, ["name"])]) is winner
@@ -0,0 +1,158 @@
+"""
+Transcription worker pool.
+
+Runs outside the API process: each worker process polls `transcription_jobs`,
+downloads the voice note, runs the agent graph (Whisper + LLM) and replies on
+WhatsApp. Start with:
+
+    python -m workers.transcription_worker [--processes N]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+
+# Allow running as a script from the backend directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import settings
+from database import SessionLocal
+from services.job_queue import claim_next_batch, complete_job, fail_job, heartbeat_job, purge_finished_jobs, purge_processed_messages, requeue_stale_jobs
+from services.job_scheduling import LANE_NAMES
+
+STALE_CHECK_INTERVAL_SECONDS = 60
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def run_worker(worker_id: int):
+    # Imported here so the model registry and graph are built inside the worker process
+    from api.webhook import handle_audio_messages
+    from services.warmup import warm_up_models
+    from services.memory_governor import memory_governor
+    from services.outbound import get_outbound_dispatcher, purge_outbound_messages
+    from services.patient_cache import start_invalidation_listener
+
+    # SIGTERM (deploys, pool shutdown) / SIGINT: finish the current job, then stop
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    print(f"👷 Worker {worker_id} started (pid {os.getpid()})")
+    # Load models before claiming anything so the first job doesn't pay cold-start time
+    await asyncio.to_thread(warm_up_models)
+    memory_governor.start()
+    start_invalidation_listener()
+    get_outbound_dispatcher().start()
+    last_stale_check = 0.0
+
+    try:
+        while not stopping.is_set():
+            try:
+                if time.monotonic() - last_stale_check > STALE_CHECK_INTERVAL_SECONDS:
+                    released = await asyncio.to_thread(_with_session, requeue_stale_jobs)
+                    if released:
+                        print(f"♻️ Worker {worker_id}: released {released} stale jobs")
+                    await asyncio.to_thread(_with_session, purge_processed_messages)
+                    await asyncio.to_thread(_with_session, purge_outbound_messages)
+                    await asyncio.to_thread(_with_session, purge_finished_jobs)
+                    last_stale_check = time.monotonic()
+
+                batch = await asyncio.to_thread(_with_session, claim_next_batch)
+            except Exception as e:
+                print(f"❌ Worker {worker_id}: queue unavailable: {e}")
+                await _sleep(stopping, settings.JOB_POLL_INTERVAL_SECONDS * 5)
+                continue
+
+            if not batch:
+                await _sleep(stopping, settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+
+            # The batch key is the job the others were claimed with
+            job = next(member for member in batch if member.batch_job_id is None)
+            lane = LANE_NAMES.get(job.priority, job.priority)
+            notes = f"{len(batch)} notes" if len(batch) > 1 else f"message {job.message_id}"
+            print(f"▶️ Worker {worker_id}: job {job.id} ({notes}, lane {lane}, tenant {job.tenant_id}, attempt {job.attempts}/{job.max_attempts})")
+            heartbeat = asyncio.create_task(_heartbeat(worker_id, job.id))
+            try:
+                try:
+                    # Returns once the WhatsApp reply is stored in the outbox
+                    await handle_audio_messages([(member.message_id, member.media_url) for member in batch], job.chat_id, tenant_id=job.tenant_id)
+                finally:
+                    heartbeat.cancel()
+            except Exception as e:
+                traceback.print_exc()
+                await asyncio.to_thread(_with_session, fail_job, job.id, f"{type(e).__name__}: {e}")
+                print(f"⚠️ Worker {worker_id}: job {job.id} failed: {e}")
+            else:
+                await asyncio.to_thread(_with_session, complete_job, job.id)
+                print(f"✅ Worker {worker_id}: job {job.id} done")
+    finally:
+        # Sends in progress finish; queued replies stay in the outbox for the other processes
+        await get_outbound_dispatcher().drain()
+        print(f"👋 Worker {worker_id} stopped")
+
+
+async def _heartbeat(worker_id: int, job_id: int):
+    """Keep the running batch's lock fresh until cancelled (see requeue_stale_jobs)."""
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            await asyncio.to_thread(_with_session, heartbeat_job, job_id)
+        except Exception as e:
+            print(f"⚠️ Worker {worker_id}: heartbeat for job {job_id} failed: {e}")
+
+
+async def _sleep(stopping: asyncio.Event, seconds: float):
+    """Sleep, waking up early when the worker is asked to stop."""
+    try:
+        await asyncio.wait_for(stopping.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _worker_main(worker_id: int):
+    try:
+        asyncio.run(run_worker(worker_id))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vita.AI transcription worker pool")
+    parser.add_argument("--processes", type=int, default=settings.TRANSCRIPTION_WORKERS)
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _worker_main(0)
+        return
+
+    # spawn: each worker gets a clean interpreter (no forked DB connections or model state)
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=_worker_main, args=(i,), name=f"transcription-worker-{i}") for i in range(args.processes)]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        # Workers stop gracefully on SIGTERM: current job finished, replies flushed
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 export interface UploadResponse {
     filename: string;
-    file_path: string;
     transcription: string;
     llm_analysis: string;
 }